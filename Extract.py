@@ -1,50 +1,141 @@
 import os
 import json
-import fitz  # PyMuPDF
-import tempfile
-import pandas as pd
-from PIL import Image
+import logging
+import threading
 from typing import List, Dict
-from sentence_transformers import SentenceTransformer
-import lancedb
-import requests
-import easyocr
-from langchain_community.llms import Ollama
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+from pipeline_cache import stage_cache, stage_key
+import embeddings
+import documents
+import ocr
+import llm_client
+import lazy
+import metrics
+import lab_parser
+from stage_pipeline import StagePipeline, Finished
+
+# Heavy imports (langchain, pandas, lancedb) are deferred until the first request
+prompts = lazy.lazy_import("langchain.prompts")
+knowledge_base = lazy.lazy_import("knowledge_base")
+
+log = logging.getLogger("chikitsa.extract")
 
 # Ensure output directory exists
-os.makedirs("extracted_results", exist_ok=True)
+OUTPUT_DIR = "extracted_results"
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Bump when a stage's logic or prompt changes so its cached outputs are ignored
+TEXT_EXTRACTION_VERSION = "2"
+ENTITY_PROMPT_VERSION = "2"
+LAB_PARSER_VERSION = "3"
+RECOMMENDATION_PROMPT_VERSION = "1"
+DEFAULT_MODEL = "mistral:latest"
+
+EMPTY_ENTITIES = {
+    "patient_info": {},
+    "test_results": {},
+    "abnormal_values": [],
+    "probable_diseases": [],
+    "conditions": [],
+    "severity_notes": []
+}
 
-# Initialize EasyOCR Reader
-reader = easyocr.Reader(['en'])
+def write_artifact(output_dir: str, name: str, data):
+    """Write a stage's output file: text as is, anything else as indented JSON."""
+    with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+        if isinstance(data, str):
+            f.write(data)
+        else:
+            json.dump(data, f, indent=2)
 
 # 1. Extract text from PDF with EasyOCR fallback
-def extract_text_from_pdf(pdf_path: str) -> str:
-    text = ""
+@metrics.timed_stage("extract_text")
+def extract_text_from_pdf(pdf_path: str, output_dir: str = OUTPUT_DIR) -> str:
     if not os.path.exists(pdf_path):
-        print(f"File not found: {pdf_path}")
-        return text
-    doc = fitz.open(pdf_path)
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        page_text = page.get_text()
-        text += page_text
-        if len(page_text.strip()) < 10:
-            pix = page.get_pixmap()
-            img_path = f"temp_page_{page_num}.png"
-            pix.save(img_path)
-            ocr_result = reader.readtext(img_path, detail=0)
-            text += "\n".join(ocr_result)
-            os.remove(img_path)
-    doc.close()
-    with open("extracted_results/raw_text.txt", "w", encoding="utf-8") as f:
-        f.write(text)
+        log.warning("File not found: %s", pdf_path)
+        return ""
+    # Each page is written out as it is read; the text is joined once at the end
+    stats = {}
+    with open(os.path.join(output_dir, "raw_text.txt"), "w", encoding="utf-8") as f:
+        text = "".join(documents.page_texts(documents.iter_pages(pdf_path), sink=f, stats=stats))
+    log.info("stage=extract_text pages=%d ocr=%d ocr_cached=%d high_dpi=%d ocr_seconds=%.2f",
+             stats.get("pages", 0), stats.get("ocr", 0), stats.get("ocr_cached", 0), stats.get("high_dpi", 0),
+             stats.get("ocr_seconds", 0.0))
     return text
 
 # 2. Entity Extraction from Lab Report using LLM
-def extract_medical_entities(text: str, model_name="mistral:latest") -> dict:
-    prompt = PromptTemplate(
+# lab_parser fills patient_info, test_results and abnormal_values from the PDF's
+# tables; the LLM is asked only for the diagnosis and whatever the parser missed.
+# Scanned (OCR'd) pages have no tables to parse, and some results aren't laid out
+# as table rows, so a report with either still goes through the full LLM
+# extraction, merged with the parser's rows.
+DIAGNOSIS_FIELDS = ["probable_diseases", "conditions", "severity_notes"]
+
+def parse_llm_json(result: str) -> dict:
+    return json.loads(result.replace("```json", "").replace("```", "").strip())
+
+def complete_parsed_entities(text: str, parsed: dict, model_name=DEFAULT_MODEL) -> dict:
+    """Fill the fields the table parser could not, from a prompt built on its results."""
+    entities = json.loads(json.dumps(EMPTY_ENTITIES))
+    entities.update(parsed)
+    missing = DIAGNOSIS_FIELDS + ([] if parsed["patient_info"] else ["patient_info"])
+    if not parsed["abnormal_values"] and "patient_info" not in missing:
+        return entities  # nothing abnormal to diagnose
+    abnormal_str = "\n".join(
+        f"{ab['test_name']}: {ab['value']} {ab['unit']} (Reference: {ab['reference_range']}, {ab['severity']})"
+        for ab in parsed["abnormal_values"]
+    )
+    header = f"\nReport header:\n{text[:1000]}\n" if "patient_info" in missing else ""
+    keys = "\n".join(f"            - {field}" for field in missing if field != "severity_notes")
+    prompt = f"""
+            Extract the following medical entities from these parsed lab results.
+            Diagnose any potential diseases based on the abnormal values and include severity
+            (e.g. confirmed, borderline).
+
+            Abnormal Values:
+            {abnormal_str or "None"}
+            {header}
+            Return strictly a JSON object with these keys:
+{keys}
+            - severity_notes (e.g. "borderline diabetes", "confirmed hypothyroidism")
+        """
+    try:
+        result = parse_llm_json(llm_client.ollama_generate(prompt, model_name)["response"])
+        for field in missing:
+            if field in result:
+                entities[field] = result[field]
+    except Exception as e:
+        log.warning("LLM diagnosis failed: %s", e)
+        entities["llm_error"] = str(e)  # keeps the partial result out of the stage cache
+    return entities
+
+def merge_parsed_entities(entities: dict, parsed: dict) -> dict:
+    """LLM entities with the table parser's rows laid over them; parsed values win for tests both found."""
+    merged = dict(entities)
+    tests = entities.get("test_results") or {}
+    if isinstance(tests, dict):
+        merged["test_results"] = {**tests, **parsed["test_results"]}
+    else:  # some models answer with a list of rows
+        merged["test_results"] = [row for row in tests if not isinstance(row, dict)
+                                  or row.get("test_name") not in parsed["test_results"]]
+        merged["test_results"] += [{"test_name": name, **row} for name, row in parsed["test_results"].items()]
+    merged["abnormal_values"] = parsed["abnormal_values"] + [
+        ab for ab in entities.get("abnormal_values") or []
+        if not isinstance(ab, dict) or ab.get("test_name") not in parsed["test_results"]
+    ]
+    merged["patient_info"] = parsed["patient_info"] or entities.get("patient_info") or {}
+    return merged
+
+@metrics.timed_stage("extract_medical_entities")
+def extract_medical_entities(text: str, model_name=DEFAULT_MODEL, output_dir: str = OUTPUT_DIR,
+                             parsed: dict = None) -> dict:
+    parsed = dict(parsed or {})
+    scanned_pages = parsed.pop("scanned_pages", [])
+    unparsed_tests = parsed.pop("unparsed_tests", [])
+    if parsed.get("test_results") and not scanned_pages and not unparsed_tests:
+        entities = complete_parsed_entities(text, parsed, model_name)
+        write_artifact(output_dir, "medical_entities.json", entities)
+        return entities
+    prompt = prompts.PromptTemplate(
         input_variables=["text"],
         template="""
             Extract the following medical entities from this lab report:
@@ -71,23 +162,16 @@ def extract_medical_entities(text: str, model_name="mistral:latest") -> dict:
             - severity_notes (e.g. "borderline diabetes", "confirmed hypothyroidism")
         """
     )
-    chain = LLMChain(llm=Ollama(model=model_name), prompt=prompt)
     try:
-        result = chain.run(text=text)
-        result = result.replace("```json", "").replace("```", "").strip()
-        entities = json.loads(result)
+        entities = parse_llm_json(llm_client.ollama_generate(prompt.format(text=text), model_name)["response"])
     except Exception as e:
-        print(f"LLM extraction failed: {e}")
-        entities = {
-            "patient_info": {},
-            "test_results": {},
-            "abnormal_values": [],
-            "probable_diseases": [],
-            "conditions": [],
-            "severity_notes": []
-        }
-    with open("extracted_results/medical_entities.json", "w", encoding="utf-8") as f:
-        json.dump(entities, f, indent=2)
+        log.warning("LLM extraction failed: %s", e)
+        entities = json.loads(json.dumps(EMPTY_ENTITIES))
+        if parsed.get("test_results"):
+            entities["llm_error"] = str(e)  # keeps the parser-only result out of the stage cache
+    if parsed.get("test_results"):
+        entities = merge_parsed_entities(entities, parsed)
+    write_artifact(output_dir, "medical_entities.json", entities)
     return entities
 
 # 3. Extract conditions from abnormalities or diseases
@@ -97,60 +181,40 @@ def extract_conditions(abnormal_values: List[Dict], probable_diseases: List[str]
         if isinstance(ab, dict) and 'condition' in ab:
             conditions.append(ab['condition'])
     if not conditions:
-        print("No conditions found. Using defaults.")
+        log.info("No conditions found. Using defaults.")
         conditions = ["diabetes", "vitamin B12 deficiency", "vitamin D deficiency", "allergic conditions"]
     return list(set(conditions))
 
-# 4. Filter dataset and create LanceDB vector DB
+# 4. Select relevant rows from the persistent LanceDB knowledge base
+DRUG_KEYWORDS = ["metformin", "cyanocobalamin", "cholecalciferol", "cetirizine"]
+
+@metrics.timed_stage("create_knowledge_base")
 def create_knowledge_base(dataset_path: str, conditions: List[str]):
     if not os.path.exists(dataset_path):
-        print("Dataset missing.")
-        return None, "", ""
-    df = pd.read_csv(dataset_path, low_memory=False)
+        log.warning("Dataset missing.")
+        return None, ""
+    kb = knowledge_base.get_knowledge_base(dataset_path)
     condition_keywords = [c.lower() for c in conditions]
-    drug_keywords = ["metformin", "cyanocobalamin", "cholecalciferol", "cetirizine"]
-    filtered = [
-        row for _, row in df.iterrows()
-        if any(k in str(row).lower() for k in condition_keywords + drug_keywords)
-    ]
-    if not filtered:
-        filtered = [
-            {"Medicine": "Metformin", "Indications": "Diabetes", "SideEffects": "GI upset", "Substitutes": "Sitagliptin", "Price": "Low", "Dosage": "500mg twice daily"},
-            {"Medicine": "Cyanocobalamin", "Indications": "B12 deficiency", "SideEffects": "Injection site pain", "Substitutes": "Hydroxocobalamin", "Price": "Moderate", "Dosage": "1000 mcg weekly IM"},
-            {"Medicine": "Cholecalciferol", "Indications": "Vitamin D deficiency", "SideEffects": "None", "Substitutes": "Ergocalciferol", "Price": "Low", "Dosage": "60,000 IU weekly"},
-            {"Medicine": "Cetirizine", "Indications": "Allergy", "SideEffects": "Drowsiness", "Substitutes": "Loratadine", "Price": "Low", "Dosage": "10mg once daily"},
-        ]
-    tmp_dir = tempfile.mkdtemp()
-    db = lancedb.connect(tmp_dir)
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    records = []
-    for i, row in enumerate(filtered):
-        content = f"Medicine: {row.get('Medicine')}\nIndications: {row.get('Indications')}\nSide Effects: {row.get('SideEffects')}\nSubstitutes: {row.get('Substitutes')}\nPrice: {row.get('Price')}\nDosage: {row.get('Dosage', 'Not specified')}"
-        records.append({
-            "id": f"med_{i}",
-            "content": content,
-            "vector": model.encode(content).tolist()
-        })
-    table = db.create_table("medical_knowledge", data=records)
-    return table, ", ".join(conditions), tmp_dir
+    return kb.filtered(condition_keywords + DRUG_KEYWORDS), ", ".join(conditions)
 
 # 5. Query LanceDB for similar medicines
-def query_lancedb(table, condition_str: str, k=5):
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    query_vector = model.encode(condition_str)
-    results = table.search(query_vector).limit(k).to_pandas()
+@metrics.timed_stage("query_lancedb")
+def query_lancedb(kb, condition_str: str, k=5):
+    query_vector = embeddings.encode(condition_str)
+    results = kb.search(query_vector, k)
     return "\n\n".join(results['content'].tolist())
 
 # 6. Generate recommendations from abnormalities + meds
-def generate_recommendations(entities, lancedb_table, condition_str, model_name="mistral:latest") -> Dict:
-    if lancedb_table is None:
+@metrics.timed_stage("generate_recommendations")
+def generate_recommendations(entities, kb, condition_str, model_name=DEFAULT_MODEL, output_dir: str = OUTPUT_DIR) -> Dict:
+    if kb is None:
         return {"error": "No knowledge base."}
     abnormals = entities.get("abnormal_values", [])
     abnormal_str = "\n".join([
         f"{ab.get('test_name')}: {ab.get('value')} {ab.get('unit')} (Reference: {ab.get('reference_range')}, {ab.get('severity')})"
         for ab in abnormals if isinstance(ab, dict)
     ])
-    context = query_lancedb(lancedb_table, condition_str)
+    context = query_lancedb(kb, condition_str)
     prompt = f"""
     Return only a JSON object with the following keys:
     - diagnoses
@@ -170,43 +234,109 @@ def generate_recommendations(entities, lancedb_table, condition_str, model_name=
     Available Medicines:
     {context}
     """
-    response = requests.post("http://localhost:11434/api/generate", json={
-        "model": model_name,
-        "prompt": prompt.strip(),
-        "format": "json",
-        "stream": False
-    })
+    result = ""
     try:
-        result = response.json().get("response", "")
+        result = llm_client.ollama_generate(prompt.strip(), model_name, format="json").get("response", "")
         recommendations = json.loads(result)
     except Exception as e:
-        recommendations = {"error": str(e), "raw_output": response.text}
-    with open("extracted_results/recommendations.json", "w", encoding="utf-8") as f:
-        json.dump(recommendations, f, indent=2)
+        recommendations = {"error": str(e), "raw_output": result}
+    write_artifact(output_dir, "recommendations.json", recommendations)
     return recommendations
 
-# 7. Cleanup LanceDB temp folder
-def cleanup(temp_dir):
-    import shutil
-    if temp_dir and os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
+# 7. Pipeline trigger
+# Each stage is cached under a key chained from the upstream stage's key, so
+# changing e.g. only the recommendation model re-runs only that stage.
+#
+# Documents flow through a shared StagePipeline: the CPU-bound text stage of one
+# upload runs while others wait on the LLM, with a bounded queue between stages.
+EXTRACT_WORKERS = int(os.environ.get("CHIKITSA_EXTRACT_WORKERS", "2"))
+LLM_STAGE_WORKERS = int(os.environ.get("CHIKITSA_LLM_STAGE_WORKERS", "2"))
+STAGE_QUEUE_SIZE = int(os.environ.get("CHIKITSA_STAGE_QUEUE_SIZE", "4"))
 
-# 8. Pipeline trigger
-def run_pipeline(pdf_path: str, dataset_path: str = "Datasets/SeS_dataset.csv") -> Dict:
-    temp_dir = ""
-    try:
-        print(f"Processing PDF: {pdf_path}")
-        text = extract_text_from_pdf(pdf_path)
-        if not text:
-            return {"error": "No text extracted."}
-        entities = extract_medical_entities(text)
+def text_stage(job: Dict):
+    if not os.path.exists(job["pdf_path"]):
+        log.warning("File not found: %s", job["pdf_path"])
+        return Finished({"error": "No text extracted."})
+    job["doc_hash"] = job["doc_hash"] or knowledge_base.file_sha256(job["pdf_path"])
+
+    # The OCR render settings change which text scanned pages yield
+    text_key = stage_key(job["doc_hash"], TEXT_EXTRACTION_VERSION, ocr.OCR_DPI, ocr.OCR_HIGH_DPI, ocr.OCR_MIN_DENSITY)
+    text = stage_cache.get("raw_text", text_key)
+    if text is None:
+        text = extract_text_from_pdf(job["pdf_path"], job["output_dir"])
+        if text:
+            stage_cache.put("raw_text", text_key, text)
+    else:
+        write_artifact(job["output_dir"], "raw_text.txt", text)
+    if not text:
+        return Finished({"error": "No text extracted."})
+    job["text"] = text
+
+    # Table parsing reads the PDF too, so it stays on the CPU side of the pipeline
+    job["entities_key"] = stage_key(text_key, job["entity_model"], ENTITY_PROMPT_VERSION, LAB_PARSER_VERSION)
+    job["entities"] = stage_cache.get("medical_entities", job["entities_key"])
+    if job["entities"] is None:
+        job["parsed"] = lab_parser.parse_pdf(job["pdf_path"])
+    return job
+
+def entities_stage(job: Dict):
+    entities = job["entities"]
+    if entities is None:
+        entities = extract_medical_entities(job["text"], job["entity_model"], output_dir=job["output_dir"],
+                                            parsed=job["parsed"])
+        if entities != EMPTY_ENTITIES and "llm_error" not in entities:
+            stage_cache.put("medical_entities", job["entities_key"], entities)
+    else:
+        write_artifact(job["output_dir"], "medical_entities.json", entities)
+    job["entities"] = entities
+
+    conditions = stage_cache.get("conditions", job["entities_key"])
+    if conditions is None:
         conditions = extract_conditions(
             entities.get("abnormal_values", []),
             entities.get("probable_diseases", []),
             entities.get("conditions", [])
         )
-        table, condition_str, temp_dir = create_knowledge_base(dataset_path, conditions)
-        recommendations = generate_recommendations(entities, table, condition_str)
-        return recommendations
-    finally:
-        cleanup(temp_dir)
\ No newline at end of file
+        if entities != EMPTY_ENTITIES and "llm_error" not in entities:
+            stage_cache.put("conditions", job["entities_key"], conditions)
+    job["conditions"] = conditions
+    return job
+
+def recommendations_stage(job: Dict) -> Dict:
+    dataset_path = job["dataset_path"]
+    dataset_version = knowledge_base.dataset_hash(dataset_path) if os.path.exists(dataset_path) else "missing"
+    recommendations_key = stage_key(job["entities_key"], job["recommendation_model"], RECOMMENDATION_PROMPT_VERSION,
+                                    dataset_version)
+    recommendations = stage_cache.get("recommendations", recommendations_key)
+    if recommendations is None:
+        kb, condition_str = create_knowledge_base(dataset_path, job["conditions"])
+        recommendations = generate_recommendations(job["entities"], kb, condition_str, job["recommendation_model"],
+                                                   output_dir=job["output_dir"])
+        if "error" not in recommendations:
+            stage_cache.put("recommendations", recommendations_key, recommendations)
+    else:
+        write_artifact(job["output_dir"], "recommendations.json", recommendations)
+    return recommendations
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> StagePipeline:
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = StagePipeline([
+                ("text", text_stage, EXTRACT_WORKERS),
+                ("entities", entities_stage, LLM_STAGE_WORKERS),
+                ("recommendations", recommendations_stage, LLM_STAGE_WORKERS),
+            ], queue_size=STAGE_QUEUE_SIZE)
+        return _engine
+
+def run_pipeline(pdf_path: str, dataset_path: str = "Datasets/SeS_dataset.csv", output_dir: str = OUTPUT_DIR,
+                 doc_hash: str = None, entity_model: str = DEFAULT_MODEL,
+                 recommendation_model: str = DEFAULT_MODEL) -> Dict:
+    log.info("Processing PDF: %s", pdf_path)
+    os.makedirs(output_dir, exist_ok=True)
+    job = {"pdf_path": pdf_path, "dataset_path": dataset_path, "output_dir": output_dir, "doc_hash": doc_hash,
+           "entity_model": entity_model, "recommendation_model": recommendation_model}
+    return get_engine().submit(job).result()
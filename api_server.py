@@ -1,14 +1,37 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import os
-import json
+import logging
+import functools
+from werkzeug.utils import secure_filename
 from Extract import run_pipeline  # <- updated function, not main()
+import ingest
+import lazy
+import metrics
+import embeddings
+from jobs import JobStore, JobQueue, QueueFull, DONE, FAILED
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app, "api_server")
+ingest.init_app(app)
+log = logging.getLogger("chikitsa.api_server")
 
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+WARMUP_MODELS = ["embedding_model", "ocr_reader"]
+
+job_store = JobStore()
+job_queue = JobQueue(job_store)
+
+
+def job_status(job):
+    return {k: job[k] for k in ("job_id", "status", "submitted_at", "started_at", "finished_at", "error", "filename")}
+
+
+def job_result_response(job):
+    if job["status"] == FAILED:
+        return jsonify({"job_id": job["job_id"], "error": job["error"]}), 500
+    if job["status"] != DONE:
+        return jsonify(job_status(job)), 202
+    return jsonify(job["result"])
 
 
 @app.route('/api/process', methods=['POST'])
@@ -17,34 +40,62 @@ def process_pdf():
     if not file:
         return jsonify({"error": "No PDF uploaded"}), 400
 
-    # Save uploaded file with its original name (or use a secure version)
-    filepath = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(filepath)
-    print(f"📁 PDF uploaded and saved to: {filepath}")
+    # Stored by content hash: a repeat upload reuses the stored file, and the hash
+    # keys the pipeline's stage cache so its results are reused too
+    filename = secure_filename(file.filename) or "report.pdf"
+    upload = ingest.get_store().ingest(file, file.filename or "report.pdf")
+    log.info("📁 PDF %s stored as %s%s", filename, upload["path"], " (duplicate)" if upload["duplicate"] else "")
 
-    # Run the pipeline using the uploaded PDF
+    # Queue the pipeline; the client polls the job for its result
     try:
-        run_pipeline(filepath)  # This creates the extracted_results files
-        return jsonify({"status": "Processing complete."})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        job = job_queue.submit(functools.partial(run_pipeline, doc_hash=upload["sha256"]), upload["path"],
+                               filename=filename, doc_hash=upload["sha256"])
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"job_id": job["job_id"], "status": job["status"], "doc_hash": upload["sha256"],
+                    "duplicate": upload["duplicate"]}), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_status(job))
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    job = job_store.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    return job_result_response(job)
 
 
 @app.route('/api/recommendations', methods=['GET'])
 def get_recommendations():
-    try:
-        with open("extracted_results/recommendations.json", "r", encoding="utf-8") as f:
-            content = f.read()
+    # Without a job_id, fall back to the most recently finished job
+    job_id = request.args.get('job_id')
+    job = job_store.get(job_id) if job_id else job_store.latest_finished()
+    if not job:
+        return jsonify({"error": "No results available"}), 404
+    return job_result_response(job)
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    # Embedding cache hits/misses/evictions and loaded models
+    return jsonify({"embeddings": embeddings.stats()})
 
-        try:
-            json_data = json.loads(content)
-            return jsonify(json_data)
-        except json.JSONDecodeError:
-            return jsonify({"raw_output": content})
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    report = lazy.status(WARMUP_MODELS)
+    report["embedding_models"] = embeddings.model_stats()
+    return jsonify(report), 200 if report["ready"] else 503
 
 
 if __name__ == '__main__':
+    metrics.configure_logging()
+    lazy.warmup_in_background(WARMUP_MODELS)
     app.run(port=5000)
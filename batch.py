@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Iterator, List, Set
+import metrics
+
+log = logging.getLogger("chikitsa.batch")
+
+# -------------------- CONFIG --------------------
+DEFAULT_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+DEFAULT_DATASET = "Datasets/SeS_dataset.csv"
+DEFAULT_WORK_DIR = "batch_results"
+DOCUMENT_EXTENSIONS = (".pdf",)
+
+
+def read_inputs(source: str) -> List[str]:
+    """Document paths from a directory or a manifest, in a stable order."""
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(DOCUMENT_EXTENSIONS))
+        return sorted(paths)
+    base = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            paths.append(path if os.path.isabs(path) else os.path.join(base, path))
+    return paths
+
+
+def read_checkpoint(out_path: str) -> Set[str]:
+    """Paths already recorded as done. A torn last line from a crash is ignored."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("status") == "done":
+                done.add(record["path"])
+    return done
+
+
+# -------------------- WORKERS --------------------
+def init_worker(log_level: int):
+    """Load the models once per worker process instead of once per document."""
+    metrics.configure_logging(log_level)
+    import lazy
+    import ocr  # noqa: F401  registers ocr_reader
+    import embeddings  # noqa: F401  registers embedding_model
+    lazy.warmup(["ocr_reader", "embedding_model"])
+
+
+def process_document(path: str, dataset_path: str, work_dir: str) -> Dict:
+    import Extract
+    import knowledge_base
+    start = time.perf_counter()
+    record = {"path": path}
+    try:
+        record["doc_hash"] = knowledge_base.file_sha256(path)
+        output_dir = os.path.join(work_dir, record["doc_hash"][:16])
+        os.makedirs(output_dir, exist_ok=True)
+        result = Extract.run_pipeline(path, dataset_path, output_dir, doc_hash=record["doc_hash"])
+        if "error" in result:
+            record.update(status="failed", error=result["error"])
+        else:
+            record.update(status="done", result=result)
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def iter_results(paths: List[str], dataset_path: str, work_dir: str, workers: int,
+                 log_level: int) -> Iterator[Dict]:
+    """Yield one record per document as workers finish, keeping at most 2 per worker in flight."""
+    context = multiprocessing.get_context("spawn")  # torch and EasyOCR are not fork-safe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(log_level,)) as pool:
+        pending = set()
+        remaining = iter(paths)
+        for path in remaining:
+            pending.add(pool.submit(process_document, path, dataset_path, work_dir))
+            if len(pending) >= workers * 2:
+                break
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+                path = next(remaining, None)
+                if path is not None:
+                    pending.add(pool.submit(process_document, path, dataset_path, work_dir))
+
+
+def run_batch(source: str, out_path: str, dataset_path: str = DEFAULT_DATASET, work_dir: str = DEFAULT_WORK_DIR,
+              workers: int = DEFAULT_WORKERS, log_level: int = logging.WARNING) -> Dict:
+    paths = read_inputs(source)
+    done = read_checkpoint(out_path)
+    todo = [path for path in paths if path not in done]
+    log.info("%d documents, %d already done, %d to process", len(paths), len(paths) - len(todo), len(todo))
+    summary = {"total": len(paths), "skipped": len(paths) - len(todo), "done": 0, "failed": 0}
+    if not todo:
+        return summary
+
+    # Build (or validate) the persistent knowledge base once so workers only open it
+    if os.path.exists(dataset_path):
+        import knowledge_base
+        knowledge_base.get_knowledge_base(dataset_path)
+    os.makedirs(work_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    if os.path.exists(out_path) and os.path.getsize(out_path):
+        with open(out_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")  # terminate a line torn by a crash so the next record parses
+    with open(out_path, "a", encoding="utf-8") as out:
+        for record in iter_results(todo, dataset_path, work_dir, workers, log_level):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            summary[record["status"]] += 1
+            finished = summary["done"] + summary["failed"]
+            rate = finished / max(time.perf_counter() - start, 1e-9) * 60
+            log.info("[%d/%d] %s %s (%ss, %.1f docs/min)", finished, len(todo), record["status"], record["path"],
+                     record["seconds"], rate)
+    elapsed = time.perf_counter() - start
+    summary["seconds"] = round(elapsed, 1)
+    finished = summary["done"] + summary["failed"]
+    summary["documents_per_minute"] = round(finished / elapsed * 60, 1) if elapsed > 0 else 0.0
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process a directory or manifest of lab reports")
+    parser.add_argument("source", help="directory of PDFs, or a manifest file with one path per line")
+    parser.add_argument("--out", default="batch_results.jsonl", help="JSONL results file, also used to resume")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR, help="per-document pipeline outputs")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--verbose", action="store_true", help="also log each pipeline stage")
+    args = parser.parse_args()
+
+    metrics.configure_logging(logging.INFO)
+    summary = run_batch(args.source, args.out, args.dataset, args.work_dir, max(1, args.workers),
+                        logging.INFO if args.verbose else logging.WARNING)
+    print(json.dumps(summary, indent=2))
@@ -0,0 +1,93 @@
+"""Test-type detection: catalog automaton vs one regex per catalog phrase.
+
+Usage: python -m benchmarks.bench_catalog [--entries 5000] [--pages 100] [--skip-baseline]
+
+Pads Datasets/test_catalog.csv with synthetic tests up to --entries and scans
+the text of a --pages lab report. The baseline is the old extract_test_types
+approach (a re.search per pattern) extended to every name and synonym.
+"""
+import os
+import re
+import time
+import random
+import argparse
+import tempfile
+import fitz  # PyMuPDF
+from benchmarks.synthetic import make_report_pdf
+from catalog_matcher import TestCatalog, CATALOG_PATH
+
+WORDS = ["serum", "plasma", "total", "free", "urine", "panel", "antibody", "antigen", "ratio", "index", "assay",
+         "profile", "screen", "level", "activity", "factor", "receptor", "marker", "titre", "culture"]
+ROOTS = ["albumin", "kinase", "peptide", "globulin", "hormone", "enzyme", "protein", "oxidase", "lipase", "amine"]
+
+
+def padded_entries(target: int, seed: int = 0):
+    rng = random.Random(seed)
+    entries = TestCatalog.load(CATALOG_PATH).entries
+    entries = list(entries.values())
+    n = 0
+    while len(entries) < target:
+        n += 1
+        name = f"{rng.choice(ROOTS).title()} {rng.choice(WORDS).title()} {n}"
+        synonyms = [f"{rng.choice(WORDS).title()} {name}", f"SYN{n} {rng.choice(ROOTS)}"]
+        entries.append({"test_id": f"SYN{n}", "name": name, "category": "synthetic", "synonyms": synonyms})
+    return entries
+
+
+def regex_scan(patterns, text):
+    found = []
+    for test_id, pattern in patterns:
+        if pattern.search(text):
+            found.append(test_id)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(prefix="chikitsa-bench-catalog-", suffix=".pdf")
+    os.close(fd)
+    try:
+        make_report_pdf(path, args.pages)
+        with fitz.open(path) as doc:
+            text = "".join(page.get_text() for page in doc)
+    finally:
+        os.remove(path)
+    # The synthetic report only has lab rows; add an imaging section like the real samples
+    text += "\nX-RAY CHEST PA\nULTRASOUND SCREENING WHOLE ABDOMEN\nECG\n2D-ECHO WITH COLOUR DOPPLER\n"
+
+    entries = padded_entries(args.entries)
+    phrases = sum(1 + len(entry["synonyms"]) for entry in entries)
+    start = time.perf_counter()
+    catalog = TestCatalog(entries)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        matches = catalog.scan(text)
+    scan_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(f"catalog: {len(entries)} tests, {phrases} phrases, {catalog.states} automaton states")
+    print(f"report: {args.pages} pages, {len(text)} chars")
+    print(f"automaton build: {build_seconds * 1000:.1f} ms")
+    print(f"automaton scan:  {scan_seconds * 1000:.1f} ms, {len(matches)} mentions, "
+          f"{len({m['test_id'] for m in matches})} distinct tests")
+
+    if not args.skip_baseline:
+        patterns = [(entry["test_id"], re.compile(r"\b" + r"\W+".join(map(re.escape, phrase.split())) + r"\b",
+                                                  re.IGNORECASE))
+                    for entry in entries for phrase in [entry["name"]] + entry["synonyms"]]
+        start = time.perf_counter()
+        found = regex_scan(patterns, text)
+        regex_seconds = time.perf_counter() - start
+        print(f"regex per phrase: {regex_seconds * 1000:.1f} ms, {len(set(found))} distinct tests "
+              f"({regex_seconds / scan_seconds:.0f}x slower, no offsets)")
+
+
+if __name__ == "__main__":
+    main()
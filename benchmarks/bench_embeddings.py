@@ -0,0 +1,94 @@
+"""Parity and throughput of the int8 ONNX embedding backend against the PyTorch model.
+
+Usage: python -m benchmarks.bench_embeddings [--sentences 2000] [--batch-sizes 1 8 32 64 128]
+                                             [--min-cosine 0.98] [--json out.json]
+
+Run `python onnx_embedder.py` once first to export the model. The corpus mixes
+knowledge-base rows, lab report lines and patient questions. Parity is the
+cosine between each sentence's two vectors, plus how many of each question's
+top-5 knowledge-base rows the backends agree on. The script exits non-zero if
+any cosine falls below --min-cosine, so it can gate CI like bench_startup.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from benchmarks.synthetic import make_ses_dataframe, make_lab_rows
+import embeddings
+from knowledge_base import row_content
+
+QUESTIONS = ["What do my test results indicate?", "Why is my HbA1c high?", "Medicine for vitamin D deficiency",
+             "Is my haemoglobin low?", "What does TSH measure?", "Treatment for high cholesterol",
+             "Side effects of metformin", "What is a normal platelet count?"]
+
+
+def make_corpus(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    kb_rows = [row_content(row) for row in make_ses_dataframe(n // 2, seed).to_dict("records")]
+    lab_lines = [f"{name} {value} {unit} {ref}" for name, value, unit, ref in make_lab_rows(rng, n // 2)]
+    questions = [rng.choice(QUESTIONS) for _ in range(n - len(kb_rows) - len(lab_lines))]
+    return kb_rows, lab_lines + questions
+
+
+def throughput(backend: str, model_name: str, sentences, batch_size: int, min_seconds: float = 1.0) -> float:
+    embeddings.encode(sentences[:batch_size], model_name, backend, batch_size=batch_size)  # warm up
+    done, start = 0, time.perf_counter()
+    while True:
+        embeddings.encode(sentences, model_name, backend, batch_size=batch_size)
+        done += len(sentences)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return done / elapsed
+
+
+def top_k(kb_vectors: np.ndarray, query_vectors: np.ndarray, k: int = 5):
+    return np.argsort(-(query_vectors @ kb_vectors.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=embeddings.DEFAULT_MODEL)
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64, 128])
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    kb_rows, other = make_corpus(args.sentences)
+    corpus = kb_rows + other
+    vectors = {}
+    for backend in ("torch", "onnx-int8"):
+        encoded = np.asarray(embeddings.encode(corpus, args.model, backend, batch_size=64), dtype=np.float32)
+        vectors[backend] = encoded / np.maximum(np.linalg.norm(encoded, axis=1, keepdims=True), 1e-12)
+    cosines = (vectors["torch"] * vectors["onnx-int8"]).sum(axis=1)
+
+    kb = {b: v[:len(kb_rows)] for b, v in vectors.items()}
+    queries = {b: np.asarray(embeddings.encode(QUESTIONS, args.model, b), dtype=np.float32) for b in vectors}
+    reference, candidate = top_k(kb["torch"], queries["torch"]), top_k(kb["onnx-int8"], queries["onnx-int8"])
+    agreement = np.mean([len(set(r) & set(c)) / len(r) for r, c in zip(reference, candidate)])
+
+    results = {"sentences": len(corpus), "cosine_mean": float(cosines.mean()), "cosine_min": float(cosines.min()),
+               "cosine_p1": float(np.percentile(cosines, 1)), "top5_agreement": float(agreement), "throughput": {}}
+    print(f"parity over {len(corpus)} sentences: cosine mean {cosines.mean():.4f}, p1 {results['cosine_p1']:.4f}, "
+          f"min {cosines.min():.4f}; top-5 KB agreement {agreement:.0%}")
+
+    sample = corpus[:512]
+    print(f"\n{'batch':>6}{'torch s/s':>12}{'onnx-int8 s/s':>15}{'speedup':>9}")
+    for batch_size in args.batch_sizes:
+        rates = {b: throughput(b, args.model, sample, batch_size) for b in ("torch", "onnx-int8")}
+        results["throughput"][batch_size] = rates
+        print(f"{batch_size:>6}{rates['torch']:>12.0f}{rates['onnx-int8']:>15.0f}"
+              f"{rates['onnx-int8'] / rates['torch']:>8.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if cosines.min() < args.min_cosine:
+        print(f"\nFAIL: minimum cosine {cosines.min():.4f} is below {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
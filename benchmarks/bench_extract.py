@@ -0,0 +1,76 @@
+"""Peak memory of reading a long report whole vs streaming it page by page.
+
+Usage: python -m benchmarks.bench_extract [--pages 500]
+
+"whole" is the old load path: concatenate every page, then chunk and scan the
+full string for tests. "streamed" feeds documents.iter_pages straight into
+context_index.iter_chunks and the catalog, one page at a time. Both keep the
+report text and its chunks, as the chatbots do; the difference is the
+transient copies. Embedding is left out so only text handling is measured.
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+import fitz  # PyMuPDF
+from benchmarks.synthetic import make_report_pdf
+import documents
+import catalog_matcher
+from context_index import iter_chunks, split_chunks
+
+
+def whole(path: str):
+    text = ""
+    doc = fitz.open(path)
+    for page in doc:
+        text += page.get_text()
+    doc.close()
+    return text, split_chunks(text), catalog_matcher.get_catalog().test_names(text)
+
+
+def streamed(path: str):
+    pages, test_types = [], {}
+
+    def report_pages():
+        for text in documents.page_texts(documents.iter_pages(path)):
+            pages.append(text)
+            test_types.update(dict.fromkeys(catalog_matcher.get_catalog().test_names(text)))
+            yield text
+
+    chunks = list(iter_chunks(report_pages()))
+    return "".join(pages), chunks, list(test_types)
+
+
+def measure(fn, path: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(path)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="chikitsa-bench-extract-"), "report.pdf")
+    make_report_pdf(path, args.pages)
+    catalog_matcher.get_catalog()  # built once per process either way; keep it out of the peaks
+
+    results = {}
+    for name, fn in (("whole", whole), ("streamed", streamed)):
+        results[name] = measure(fn, path)
+    (text, chunks, tests), _, _ = results["whole"]
+    assert results["streamed"][0] == (text, chunks, tests), "streamed extraction differs from whole-text"
+
+    print(f"report: {args.pages} pages, {len(text) / 1e6:.2f} MB text, {len(chunks)} chunks, {len(tests)} tests")
+    for name, (_, seconds, peak) in results.items():
+        print(f"{name:<10}{seconds:>8.2f} s{peak / 1e6:>10.1f} MB peak")
+
+
+if __name__ == "__main__":
+    main()
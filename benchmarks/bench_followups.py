@@ -0,0 +1,65 @@
+"""Per-turn latency of chikitsa_ai follow-up questions with and without Ollama context reuse.
+
+Usage: python -m benchmarks.bench_followups [--pages 20] [--prompt-token-delay 0.002]
+
+The mock server charges --prompt-token-delay for every prompt token it has to
+read, but nothing for tokens handed back through `context`, which is what a warm
+Ollama KV cache buys. Without conversation mode every turn re-sends the report
+context; with it only the first turn does.
+"""
+import os
+import time
+import argparse
+import tempfile
+from benchmarks.synthetic import make_report_pdf
+
+QUESTIONS = [
+    "What do my test results indicate?",
+    "What is the meaning of my HbA1c value?",
+    "Why was a vitamin D test done?",
+    "What does a low haemoglobin mean?",
+    "Give me a summary of the report",
+    "What is TSH?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.002, help="mock prefill cost per prompt token")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chikitsa-bench-followups-")
+    import mock_llm_server
+    _, llm_url = mock_llm_server.serve_in_thread(FIRST_TOKEN_DELAY=args.first_token_delay, TOKEN_DELAY=0,
+                                                 PROMPT_TOKEN_DELAY=args.prompt_token_delay)
+    os.environ.update({"OLLAMA_URL": llm_url,
+                       "CHIKITSA_EMBEDDING_CACHE": os.path.join(workdir, "embeddings.sqlite")})
+    os.chdir(workdir)  # load_report writes extracted_report.txt to the working directory
+    import chikitsa_ai
+
+    report_path = os.path.join(workdir, "report.pdf")
+    make_report_pdf(report_path, args.pages)
+
+    results = {}
+    for mode, conversation in (("stateless", False), ("conversation", True)):
+        chatbot = chikitsa_ai.MedicalReportChatbot(model_name="mistral", conversation=conversation)
+        chatbot.load_report(report_path)
+        latencies = []
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            chatbot.process_query(question)
+            latencies.append(time.perf_counter() - start)
+        results[mode] = latencies
+
+    print(f"\n{'turn':<6}{'stateless':>12}{'conversation':>14}")
+    for turn, (stateless, conversation) in enumerate(zip(results["stateless"], results["conversation"]), start=1):
+        print(f"{turn:<6}{stateless:>12.3f}{conversation:>14.3f}")
+    followups = slice(1, None)
+    means = [sum(results[mode][followups]) / (len(QUESTIONS) - 1) for mode in ("stateless", "conversation")]
+    print(f"{'mean follow-up':<14}\n{'':<6}{means[0]:>12.3f}{means[1]:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
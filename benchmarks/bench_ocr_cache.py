@@ -0,0 +1,78 @@
+"""OCR time for a bundle of scanned reports that share cover and disclaimer pages.
+
+Usage: python -m benchmarks.bench_ocr_cache [--reports 5] [--pages 2]
+
+Each report is a scanned cover, --pages scanned result pages and a scanned
+disclaimer; only the result pages differ between reports. The bundle is read
+twice with a fresh OCR cache: the first pass OCRs each repeated page once, the
+second pass hits the cache for everything. Needs EasyOCR.
+"""
+import os
+import time
+import argparse
+import tempfile
+import fitz  # PyMuPDF
+from benchmarks.synthetic import make_report_pdf
+
+COVER = ["CHIKITSA DIAGNOSTICS", "NABL Accredited Laboratory", "12 Hospital Road, Pune 411001",
+         "Phone: 020-5550100   www.chikitsa.example"]
+DISCLAIMER = ["This report is for the use of the referring physician only.",
+              "Results relate only to the sample as received.",
+              "Not valid for medico-legal purposes.", "*** End of Report ***"]
+
+
+def scanned_page(doc, lines, dpi: int = 150):
+    source = fitz.open()
+    page = source.new_page()
+    for i, line in enumerate(lines):
+        page.insert_text((60, 120 + 30 * i), line, fontsize=14)
+    image_page = doc.new_page()
+    image_page.insert_image(image_page.rect, pixmap=page.get_pixmap(dpi=dpi))
+    source.close()
+
+
+def make_bundle(path: str, reports: int, pages: int, workdir: str):
+    bundle = fitz.open()
+    for i in range(reports):
+        scanned_page(bundle, COVER)
+        body_path = os.path.join(workdir, f"body{i}.pdf")
+        make_report_pdf(body_path, pages, scanned=True, seed=i)
+        with fitz.open(body_path) as body:
+            bundle.insert_pdf(body)
+        scanned_page(bundle, DISCLAIMER)
+    bundle.save(path)
+    bundle.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=2, help="result pages per report")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chikitsa-bench-ocr-")
+    os.environ["CHIKITSA_OCR_CACHE"] = os.path.join(workdir, "ocr.sqlite")
+    import documents
+    import ocr
+    import ocr_cache
+
+    path = os.path.join(workdir, "bundle.pdf")
+    make_bundle(path, args.reports, args.pages, workdir)
+    ocr.get_reader()  # load the model before timing
+
+    print(f"bundle: {args.reports} reports x ({args.pages} result pages + cover + disclaimer), "
+          f"OCR at {ocr.OCR_DPI} dpi, {ocr.OCR_HIGH_DPI} dpi for sparse pages")
+    print(f"{'pass':<8}{'seconds':>9}{'OCR':>6}{'cached':>8}{'high dpi':>10}")
+    for name in ("cold", "warm"):
+        stats = {}
+        start = time.perf_counter()
+        for _ in documents.page_texts(documents.iter_pages(path), stats=stats):
+            pass
+        seconds = time.perf_counter() - start
+        print(f"{name:<8}{seconds:>9.2f}{stats['ocr'] - stats['ocr_cached']:>6}{stats['ocr_cached']:>8}"
+              f"{stats['high_dpi']:>10}")
+    print(ocr_cache.get_cache().stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Throughput of run_pipeline for a stream of uploads, one at a time vs concurrently.
+
+Usage: python -m benchmarks.bench_pipeline [--documents 8] [--pages 10] [--llm-latency 0.5]
+
+Sequential calls leave the CPU idle while the (mock) LLM works; concurrent
+submitters let the stage pipeline overlap one document's text extraction with
+another's LLM calls. Each mode gets its own documents so neither hits the
+other's stage cache.
+"""
+import os
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic import make_report_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--scanned", action="store_true", help="image-only pages, so extraction runs OCR")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chikitsa-bench-pipeline-")
+    import mock_llm_server
+    _, llm_url = mock_llm_server.serve_in_thread(FIRST_TOKEN_DELAY=args.llm_latency, TOKEN_DELAY=0)
+    os.environ.update({
+        "OLLAMA_URL": llm_url,
+        "CHIKITSA_PIPELINE_CACHE": os.path.join(workdir, "pipeline_cache"),
+        "CHIKITSA_KB_DIR": os.path.join(workdir, "knowledge_base"),
+    })
+    import Extract
+
+    def documents(offset):
+        paths = []
+        for i in range(args.documents):
+            path = os.path.join(workdir, f"report_{offset + i}.pdf")
+            make_report_pdf(path, args.pages, scanned=args.scanned, seed=offset + i)
+            paths.append(path)
+        return paths
+
+    def run(path):
+        return Extract.run_pipeline(path, os.path.join(workdir, "missing.csv"), workdir)
+
+    sequential = documents(0)
+    start = time.perf_counter()
+    for path in sequential:
+        run(path)
+    sequential_seconds = time.perf_counter() - start
+
+    concurrent = documents(args.documents)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.documents) as pool:
+        list(pool.map(run, concurrent))
+    concurrent_seconds = time.perf_counter() - start
+
+    print(f"{'mode':<12}{'seconds':>10}{'docs/min':>10}")
+    for mode, seconds in (("sequential", sequential_seconds), ("concurrent", concurrent_seconds)):
+        print(f"{mode:<12}{seconds:>10.2f}{args.documents / seconds * 60:>10.1f}")
+    print(f"stage stats: {Extract.get_engine().stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Compare the vectorized keyword prefilter against the old iterrows loop.
+
+Usage: python -m benchmarks.bench_prefilter [--sizes 10000 100000 1000000]
+"""
+import argparse
+import time
+from prefilter import build_search_column, match_rows
+from benchmarks.synthetic import make_ses_dataframe
+
+KEYWORDS = ["diabetes", "vitamin b12 deficiency", "vitamin d deficiency", "allergic conditions",
+            "metformin", "cyanocobalamin", "cholecalciferol", "cetirizine"]
+
+
+def legacy_filter(df, keywords):
+    return [
+        i for i, (_, row) in enumerate(df.iterrows())
+        if any(k in str(row).lower() for k in keywords)
+    ]
+
+
+def vectorized_filter(df, keywords):
+    return match_rows(build_search_column(df), keywords)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max-rows", type=int, default=20_000,
+                        help="time the legacy loop on at most this many rows and extrapolate linearly")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy (s)':>14} {'build col (s)':>14} {'match (s)':>10} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_ses_dataframe(n)
+
+        sample = df.head(min(n, args.legacy_max_rows))
+        start = time.perf_counter()
+        legacy_filter(sample, KEYWORDS)
+        legacy = (time.perf_counter() - start) * n / len(sample)
+        extrapolated = "*" if len(sample) < n else " "
+
+        start = time.perf_counter()
+        column = build_search_column(df)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        match_rows(column, KEYWORDS)
+        match = time.perf_counter() - start
+
+        print(f"{n:>10} {legacy:>13.2f}{extrapolated} {build:>14.3f} {match:>10.3f} {legacy / (build + match):>8.1f}x")
+    print("* legacy time extrapolated from --legacy-max-rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Cold-start time of the Python servers: import time of each entry module in a fresh interpreter.
+
+Usage: python -m benchmarks.bench_startup [--runs 5] [--json out.json] [--max-seconds 2.0] [--check-ready]
+
+With --max-seconds the script exits non-zero if any module's median import time
+exceeds the budget, so it can gate CI against cold-start regressions. With
+--check-ready it also fails unless each server's readiness endpoint answers 200
+with warm-up disabled, where models only load on first use.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+MODULES = ["api_server", "chikiai_server", "medical_assistant"]
+
+PROBE = "import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+READY_ROUTES = {"api_server": "/api/ready", "chikiai_server": "/ready"}
+READY_PROBE = "import {module}; print({module}.app.test_client().get({route!r}).status_code)"
+
+
+def measure(module: str, runs: int):
+    imports, processes = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", PROBE.format(module=module)],
+                             capture_output=True, text=True, env={**os.environ, "CHIKITSA_WARMUP": "0"})
+        processes.append(time.perf_counter() - start)
+        if out.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{out.stderr}")
+        imports.append(float(out.stdout.strip().splitlines()[-1]))
+    return {"import_median_s": round(statistics.median(imports), 4),
+            "import_max_s": round(max(imports), 4),
+            "process_median_s": round(statistics.median(processes), 4)}
+
+
+def ready_without_warmup(module: str) -> bool:
+    out = subprocess.run([sys.executable, "-c", READY_PROBE.format(module=module, route=READY_ROUTES[module])],
+                         capture_output=True, text=True, env={**os.environ, "CHIKITSA_WARMUP": "0"})
+    if out.returncode != 0:
+        raise RuntimeError(f"readiness probe of {module} failed:\n{out.stderr}")
+    return out.stdout.strip().splitlines()[-1] == "200"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--max-seconds", type=float, help="fail if a median import exceeds this")
+    parser.add_argument("--check-ready", action="store_true", help="fail if /ready is not 200 without warm-up")
+    args = parser.parse_args()
+
+    results = {}
+    for module in args.modules:
+        results[module] = measure(module, args.runs)
+        print(f"{module:>20}: import {results[module]['import_median_s']:.3f}s median, "
+              f"process {results[module]['process_median_s']:.3f}s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    over = [m for m, r in results.items() if args.max_seconds and r["import_median_s"] > args.max_seconds]
+    if over:
+        print(f"Over the {args.max_seconds}s budget: {', '.join(over)}")
+    not_ready = [m for m in args.modules if args.check_ready and m in READY_ROUTES and not ready_without_warmup(m)]
+    if not_ready:
+        print(f"Not ready with CHIKITSA_WARMUP=0: {', '.join(not_ready)}")
+    if over or not_ready:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
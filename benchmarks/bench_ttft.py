@@ -0,0 +1,59 @@
+"""Time-to-first-token for /api/message vs /api/message/stream against the mock LLM.
+
+Usage: python -m benchmarks.bench_ttft [--requests 5] [--token-delay 0.02]
+
+Every request sends the same prompt, so the semantic cache is turned off to
+time the LLM path rather than cache hits.
+"""
+import os
+import time
+import argparse
+import threading
+import requests
+from werkzeug.serving import make_server
+import mock_llm_server
+
+
+def time_blocking(url, message):
+    start = time.perf_counter()
+    requests.post(f"{url}/api/message", json={"message": message}).raise_for_status()
+    total = time.perf_counter() - start
+    return total, total
+
+
+def time_streaming(url, message):
+    start = time.perf_counter()
+    first = None
+    with requests.post(f"{url}/api/message/stream", json={"message": message}, stream=True) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("data:") and '"token"' in line and first is None:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+
+    _, llm_url = mock_llm_server.serve_in_thread(FIRST_TOKEN_DELAY=args.first_token_delay,
+                                                 TOKEN_DELAY=args.token_delay)
+    os.environ["CHIKITSA_SEMANTIC_CACHE"] = "0"  # read when medical_assistant is imported
+    import medical_assistant
+    medical_assistant.MISTRAL_ENDPOINT = f"{llm_url}/v1/chat/completions"
+    server = make_server("127.0.0.1", 0, medical_assistant.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    for name, fn in (("blocking", time_blocking), ("streaming", time_streaming)):
+        runs = [fn(url, "what should I take for a fever") for _ in range(args.requests)]
+        ttft = sorted(r[0] for r in runs)[len(runs) // 2]
+        total = sorted(r[1] for r in runs)[len(runs) // 2]
+        print(f"{name:>10}: median TTFT {ttft * 1000:7.1f} ms, median total {total * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
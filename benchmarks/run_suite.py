@@ -0,0 +1,182 @@
+"""End-to-end benchmark of the report pipeline against the mock LLM backends.
+
+Usage: python -m benchmarks.run_suite [--pages 1 5 20] [--csv-rows 1000 10000 100000]
+                                      [--llm-latency 0.5] [--skip chiki] [--out results.json]
+
+Generates text-layer and scanned PDFs and SeS-style CSVs, points Extract, chiki and
+medical_assistant at mock_llm_server, and records per-stage wall time, throughput
+and peak memory. Peak memory is the tracemalloc peak of Python allocations during
+the stage; native allocations (torch, faiss, EasyOCR) show up in max_rss_mb only.
+Every artefact and cache lives in a temporary directory, so runs start cold and can
+be compared through the JSON they write.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import tracemalloc
+import subprocess
+from benchmarks.synthetic import make_report_pdf, write_ses_csv
+
+COMPONENTS = ["stages", "pipeline", "chiki", "assistant"]
+
+
+def timed(fn, *args, **kwargs):
+    """Run fn, returning (result, record) where record has seconds, peak_mb and any error."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result, error = None, None
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    record = {"seconds": round(seconds, 4), "peak_mb": round(peak / (1024 * 1024), 2)}
+    if error:
+        record["error"] = error
+    return result, record
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def bench_stages(Extract, pdf_path, pages, dataset_path, workdir):
+    stages = {}
+    text, stages["extract_text"] = timed(Extract.extract_text_from_pdf, pdf_path, workdir)
+    stages["extract_text"]["pages_per_second"] = round(pages / max(stages["extract_text"]["seconds"], 1e-9), 2)
+    parsed, stages["parse_lab_tables"] = timed(Extract.lab_parser.parse_pdf, pdf_path)
+    entities, stages["extract_medical_entities"] = timed(Extract.extract_medical_entities, text or "",
+                                                         output_dir=workdir, parsed=parsed)
+    entities = entities or Extract.EMPTY_ENTITIES
+    conditions, stages["extract_conditions"] = timed(
+        Extract.extract_conditions, entities.get("abnormal_values", []),
+        entities.get("probable_diseases", []), entities.get("conditions", []))
+    kb_result, stages["create_knowledge_base"] = timed(Extract.create_knowledge_base, dataset_path, conditions or [])
+    kb, condition_str = kb_result or (None, "")
+    if kb is not None:
+        _, stages["query_lancedb"] = timed(Extract.query_lancedb, kb, condition_str)
+    _, stages["generate_recommendations"] = timed(Extract.generate_recommendations, entities, kb, condition_str,
+                                                  output_dir=workdir)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--csv-rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mock LLM delay before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="mock LLM delay per generated token")
+    parser.add_argument("--assistant-requests", type=int, default=20)
+    parser.add_argument("--skip", nargs="*", default=[], choices=COMPONENTS)
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="chikitsa-bench-")
+    import mock_llm_server
+    _, llm_url = mock_llm_server.serve_in_thread(FIRST_TOKEN_DELAY=args.llm_latency, TOKEN_DELAY=args.token_delay)
+
+    # Configure every cache and backend before the project modules read their settings
+    os.environ.update({
+        "OLLAMA_URL": llm_url,
+        "MISTRAL_ENDPOINT": f"{llm_url}/v1/chat/completions",
+        "CHIKITSA_PIPELINE_CACHE": os.path.join(workdir, "pipeline_cache"),
+        "CHIKITSA_KB_DIR": os.path.join(workdir, "knowledge_base"),
+        "CHIKITSA_EMBEDDING_CACHE": os.path.join(workdir, "embeddings.sqlite"),
+        "CHIKITSA_OCR_CACHE": os.path.join(workdir, "ocr.sqlite"),
+        "CHIKITSA_JOB_DIR": os.path.join(workdir, "jobs"),
+        # The assistant benchmark repeats one question; measure the LLM path, not cache hits
+        "CHIKITSA_SEMANTIC_CACHE": "0",
+    })
+    import Extract
+    import medical_assistant
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "stages": [], "pipeline": [], "chiki": [], "assistant": {},
+    }
+
+    datasets = {}
+    for rows in args.csv_rows:
+        datasets[rows] = os.path.join(workdir, f"ses_{rows}.csv")
+        write_ses_csv(datasets[rows], rows)
+    documents = []
+    for scanned in (False, True):
+        for pages in args.pages:
+            path = os.path.join(workdir, f"report_{'scanned' if scanned else 'text'}_{pages}p.pdf")
+            make_report_pdf(path, pages, scanned=scanned)
+            documents.append({"path": path, "pages": pages, "kind": "scanned" if scanned else "text"})
+
+    if "stages" not in args.skip:
+        for rows, dataset_path in datasets.items():
+            for doc in documents:
+                print(f"stages: {doc['kind']} {doc['pages']}p, {rows} dataset rows")
+                stages = bench_stages(Extract, doc["path"], doc["pages"], dataset_path, workdir)
+                results["stages"].append({"kind": doc["kind"], "pages": doc["pages"], "dataset_rows": rows,
+                                          "stages": stages})
+
+    if "pipeline" not in args.skip:
+        dataset_path = datasets[min(datasets)]
+        for doc in documents:
+            print(f"run_pipeline: {doc['kind']} {doc['pages']}p")
+            runs = {}
+            # First call misses the stage cache; the second is a repeat upload of the same bytes
+            for label in ("cold", "warm"):
+                _, runs[label] = timed(Extract.run_pipeline, doc["path"], dataset_path, workdir)
+                runs[label]["documents_per_minute"] = round(60 / max(runs[label]["seconds"], 1e-9), 1)
+            results["pipeline"].append({"kind": doc["kind"], "pages": doc["pages"], **runs})
+
+    if "chiki" not in args.skip:
+        from chiki import MedicalReportChatbot
+        for doc in documents:
+            print(f"chiki: {doc['kind']} {doc['pages']}p")
+            chatbot = MedicalReportChatbot(index_path=os.path.join(workdir, "vector_index"))
+            _, load = timed(chatbot.load_report, doc["path"])
+            _, query = timed(chatbot.process_query, "What do my HbA1c results mean?")
+            results["chiki"].append({"kind": doc["kind"], "pages": doc["pages"], "load_report": load,
+                                     "process_query": query})
+
+    if "assistant" not in args.skip:
+        print(f"medical_assistant: {args.assistant_requests} requests")
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(args.assistant_requests):
+            _, record = timed(medical_assistant.get_medical_response, "what should I take for a fever")
+            latencies.append(record["seconds"])
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        results["assistant"] = {
+            "requests": len(latencies),
+            "p50_seconds": latencies[len(latencies) // 2],
+            "p95_seconds": latencies[int(len(latencies) * 0.95)],
+            "requests_per_second": round(len(latencies) / elapsed, 2),
+        }
+
+    results["meta"]["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.out}")
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
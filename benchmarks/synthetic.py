@@ -0,0 +1,82 @@
+import random
+import pandas as pd
+
+MEDICINES = ["Metformin", "Glimepiride", "Cyanocobalamin", "Cholecalciferol", "Cetirizine", "Atorvastatin",
+             "Amlodipine", "Levothyroxine", "Paracetamol", "Ibuprofen", "Omeprazole", "Azithromycin"]
+INDICATIONS = ["Type 2 diabetes", "Vitamin B12 deficiency", "Vitamin D deficiency", "Allergic rhinitis",
+               "Hypercholesterolemia", "Hypertension", "Hypothyroidism", "Fever", "Pain", "Acid reflux",
+               "Bacterial infection", "Anemia"]
+SIDE_EFFECTS = ["Nausea", "Headache", "Drowsiness", "Dizziness", "GI upset", "Rash", "None"]
+PRICES = ["Low", "Moderate", "High"]
+DOSAGES = ["500mg twice daily", "10mg once daily", "1000 mcg weekly IM", "60,000 IU weekly", "As directed"]
+
+
+def make_ses_dataframe(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """SeS_dataset.csv-shaped frame with random but realistic-looking rows."""
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        "Medicine": [f"{rng.choice(MEDICINES)} {rng.randint(1, 999)}" for _ in range(n_rows)],
+        "Indications": [rng.choice(INDICATIONS) for _ in range(n_rows)],
+        "SideEffects": [rng.choice(SIDE_EFFECTS) for _ in range(n_rows)],
+        "Substitutes": [rng.choice(MEDICINES) for _ in range(n_rows)],
+        "Price": [rng.choice(PRICES) for _ in range(n_rows)],
+        "Dosage": [rng.choice(DOSAGES) for _ in range(n_rows)],
+    })
+
+
+# name, unit, reference range, low, high
+LAB_TESTS = [
+    ("Fasting Blood Sugar", "mg/dL", "70 - 100", 70, 100),
+    ("HbA1c", "%", "4.0 - 5.6", 4.0, 5.6),
+    ("Vitamin B12", "pg/mL", "200 - 900", 200, 900),
+    ("Vitamin D (25-OH)", "ng/mL", "30 - 100", 30, 100),
+    ("Total IgE", "IU/mL", "0 - 100", 0, 100),
+    ("Haemoglobin", "g/dL", "12.0 - 15.5", 12.0, 15.5),
+    ("Total Leucocyte Count", "cells/cumm", "4000 - 11000", 4000, 11000),
+    ("Platelet Count", "lakhs/cumm", "1.5 - 4.5", 1.5, 4.5),
+    ("Serum Creatinine", "mg/dL", "0.6 - 1.2", 0.6, 1.2),
+    ("TSH", "uIU/mL", "0.4 - 4.0", 0.4, 4.0),
+    ("Total Cholesterol", "mg/dL", "0 - 200", 0, 200),
+    ("Sodium", "mmol/L", "135 - 145", 135, 145),
+]
+
+
+def make_lab_rows(rng: random.Random, count: int):
+    rows = []
+    for _ in range(count):
+        name, unit, ref, low, high = rng.choice(LAB_TESTS)
+        span = high - low
+        value = round(rng.uniform(low - 0.3 * span, high + 0.3 * span), 1)
+        rows.append((name, str(value), unit, ref))
+    return rows
+
+
+def make_report_pdf(path: str, pages: int, scanned: bool = False, seed: int = 0, rows_per_page: int = 25):
+    """Lab-report PDF laid out as a table; scanned=True stores each page only as an image."""
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        source = fitz.open() if scanned else doc
+        page = source.new_page()
+        page.insert_text((50, 50), f"CHIKITSA DIAGNOSTICS - Lab Report - Page {page_num + 1}", fontsize=12)
+        page.insert_text((50, 70), "Patient: Test Patient   Age: 45   Gender: F", fontsize=10)
+        y = 100
+        for cell, x in zip(("Test", "Result", "Unit", "Reference Range"), (50, 250, 330, 420)):
+            page.insert_text((x, y), cell, fontsize=10)
+        for row in make_lab_rows(rng, rows_per_page):
+            y += 18
+            for cell, x in zip(row, (50, 250, 330, 420)):
+                page.insert_text((x, y), cell, fontsize=10)
+        if scanned:
+            pix = page.get_pixmap(dpi=150)
+            image_page = doc.new_page()
+            image_page.insert_image(image_page.rect, pixmap=pix)
+            source.close()
+    doc.save(path)
+    doc.close()
+
+
+def write_ses_csv(path: str, n_rows: int, seed: int = 0):
+    make_ses_dataframe(n_rows, seed).to_csv(path, index=False)
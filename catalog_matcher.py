@@ -0,0 +1,151 @@
+import os
+import re
+import csv
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# -------------------- CONFIG --------------------
+CATALOG_PATH = os.environ.get("CHIKITSA_TEST_CATALOG",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "Datasets", "test_catalog.csv"))
+
+# Matching works on word tokens, so case, hyphens, brackets and line breaks inside a
+# test name don't matter ("2D-ECHO WITH\nCOLOUR DOPPLER") and a name never matches
+# inside a longer word ("ECG" in "ECGX").
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# A one-word name or synonym of a measured test ("Iron", "Calcium", "Hb", "TG") is
+# also ordinary prose, so it only counts when a result follows within VALUE_WINDOW
+# tokens, as in a table row. Reports of descriptive tests (scans, scopes) carry no
+# value, so their one-word names ("Mammography", "ECG") always count.
+VALUE_WINDOW = 4
+RESULT_WORDS = {"positive", "negative", "reactive", "nonreactive", "detected", "present", "absent", "nil", "trace"}
+DESCRIPTIVE_CATEGORIES = {"imaging", "cardiac_imaging", "endoscopy", "neurology", "cytology", "respiratory", "other"}
+# Reports scanned page by page carry this much of each page into the next scan, so a
+# name (or its value) broken across a page boundary is still found
+PAGE_OVERLAP_CHARS = 200
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """(token, start, end) for each word in text, with offsets into the original string."""
+    return [(m.group(), m.start(), m.end()) for m in TOKEN_RE.finditer(text.lower())]
+
+
+def _value_follows(tokens: List[Tuple[str, int, int]], position: int) -> bool:
+    return any(token.isdigit() or token in RESULT_WORDS
+               for token, _, _ in tokens[position + 1:position + 1 + VALUE_WINDOW])
+
+
+def page_tail(text: str, chars: int = PAGE_OVERLAP_CHARS) -> str:
+    """The end of a page to prepend to the next one before scanning, starting at a word boundary."""
+    if len(text) <= chars:
+        return text
+    tail = text[-chars:]
+    match = re.search(r"\s", tail)
+    return tail[match.end():] if match else ""
+
+
+class TestCatalog:
+    """Aho-Corasick automaton over the token sequences of every test name and synonym.
+
+    One pass over a report's tokens finds every catalog entry it mentions, however
+    many entries there are; overlapping hits resolve to the longest, leftmost one.
+    """
+
+    def __init__(self, entries: List[Dict]):
+        self.entries = {entry["test_id"]: entry for entry in entries}
+        self._measured = {entry["test_id"] for entry in entries
+                          if entry.get("category", "") not in DESCRIPTIVE_CATEGORIES}
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, int]]] = [[]]  # (test_id, pattern length in tokens)
+        for entry in entries:
+            for phrase in [entry["name"]] + entry.get("synonyms", []):
+                self._add(tuple(token for token, _, _ in tokenize(phrase)), entry["test_id"])
+        self._build_links()
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "TestCatalog":
+        """Read a CSV with test_id, name, category and |-separated synonyms columns."""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            entries = [
+                {"test_id": row["test_id"], "name": row["name"], "category": row.get("category", ""),
+                 "synonyms": [s.strip() for s in (row.get("synonyms") or "").split("|") if s.strip()]}
+                for row in csv.DictReader(f)
+            ]
+        return cls(entries)
+
+    def _add(self, tokens: Tuple[str, ...], test_id: str):
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        if (test_id, len(tokens)) not in self._output[state]:
+            self._output[state].append((test_id, len(tokens)))
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    @property
+    def states(self) -> int:
+        return len(self._goto)
+
+    def scan(self, text: str) -> List[Dict]:
+        """Every non-overlapping catalog mention as {test_id, name, start, end, text}, in text order."""
+        tokens = tokenize(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        hits = []
+        state = 0
+        for position, (token, _, _) in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for test_id, length in output[state]:
+                if length == 1 and test_id in self._measured and not _value_follows(tokens, position):
+                    continue
+                hits.append((position - length + 1, position, test_id))
+
+        # Longest match first at each start; drop hits overlapping one already taken
+        hits.sort(key=lambda hit: (hit[0], hit[0] - hit[1]))
+        matches, taken_until = [], -1
+        for first, last, test_id in hits:
+            if first <= taken_until:
+                continue
+            start, end = tokens[first][1], tokens[last][2]
+            matches.append({"test_id": test_id, "name": self.entries[test_id]["name"], "start": start, "end": end,
+                            "text": text[start:end]})
+            taken_until = last
+        return matches
+
+    def test_names(self, text: str) -> List[str]:
+        """Canonical names of the tests mentioned in text, in order of first mention."""
+        return list(dict.fromkeys(match["name"] for match in self.scan(text)))
+
+
+_catalog: Optional[TestCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> TestCatalog:
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = TestCatalog.load()
+        return _catalog
@@ -1,92 +1,52 @@
 import os
-import fitz  # PyMuPDF
-import easyocr
-import docx2txt
-import re
 import json
-from langchain_community.llms import Ollama
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import RetrievalQA
+import embeddings
+import llm_client
+import lazy
+import metrics
+import documents
+import catalog_matcher
+from index_store import get_store, index_key
+
+vectorstores = lazy.lazy_import("langchain_community.vectorstores")
+text_splitter = lazy.lazy_import("langchain.text_splitter")
 
 # -----------------------------
 # Text Extraction Functions
 # -----------------------------
-def extract_text_from_pdf(file_path):
-    text = ""
-    try:
-        doc = fitz.open(file_path)
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-    except Exception as e:
-        print(f"[PDF Error] {e}")
-    return text
-
-def extract_text_from_image(file_path):
-    try:
-        reader = easyocr.Reader(['en'])
-        result = reader.readtext(file_path, detail=0)
-        return "\n".join(result)
-    except Exception as e:
-        print(f"[Image OCR Error] {e}")
-        return ""
-
-def extract_text_from_docx(file_path):
-    try:
-        return docx2txt.process(file_path)
-    except Exception as e:
-        print(f"[DOCX Error] {e}")
-        return ""
-
-def extract_text_from_file(file_path):
-    if not os.path.exists(file_path):
-        return f"Error: File {file_path} not found."
-    ext = os.path.splitext(file_path)[1].lower()
-    if ext == '.pdf':
-        return extract_text_from_pdf(file_path)
-    elif ext in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']:
-        return extract_text_from_image(file_path)
-    elif ext in ['.docx', '.doc']:
-        return extract_text_from_docx(file_path)
-    elif ext in ['.txt', '.csv']:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
-    elif ext == '.json':
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    else:
-        return f"Unsupported file format: {ext}"
-
 def extract_test_types(text):
-    test_types = []
-    patterns = [
-        r"X-RAY\s+CHEST\s+PA",
-        r"ULTRASOUND\s+SCREENING\s+WHOLE\s+ABDOMEN",
-        r"ECG",
-        r"2D-ECHO\s+WITH\s+COLOUR\s+DOPPLER"
-    ]
-    for p in patterns:
-        match = re.search(p, text, re.IGNORECASE)
-        if match:
-            test_types.append(match.group(0))
-    return test_types
+    try:
+        return catalog_matcher.get_catalog().test_names(text)
+    except OSError as e:
+        print(f"[Test Catalog Error] {e}")
+        return []
 
 # -----------------------------
 # Agentic RAG Chatbot Class
 # -----------------------------
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+QA_PROMPT = """Use the following pieces of context to answer the question at the end. If you don't know the answer, just say that you don't know, don't try to make up an answer.
+
+{context}
+
+Question: {question}
+Helpful Answer:"""
+
 class MedicalReportChatbot:
     def __init__(self, model_name="mistral", index_path="vector_index"):
         self.model_name = model_name
-        self.llm = Ollama(model=model_name)
+        self.llm = llm_client.OllamaLLM(model_name)
         self.report_text = ""
         self.test_types = []
         self.file_path = ""
         self.recommendations = {}
-        self.index_path = index_path
+        self.index_path = index_path  # root of the document-keyed index store
+        self.index_key = None
+        self.vectorstore = None
         self.retriever = None
-        self.qa_chain = None
+        self.has_index = False
 
         # Load recommendation data if exists
         if os.path.exists("recommendations.json"):
@@ -95,23 +55,22 @@ class MedicalReportChatbot:
 
     def build_vectorstore(self, text):
         # Chunking
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+        splitter = text_splitter.RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
         docs = splitter.create_documents([text])
 
         # Embedding
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        vectorstore = FAISS.from_documents(docs, embeddings)
-        vectorstore.save_local(self.index_path)
+        vectorstore = vectorstores.FAISS.from_documents(docs, embeddings.get_langchain_embeddings())
+        get_store(self.index_path).save(self.index_key, vectorstore)
         return vectorstore
 
     def load_vectorstore(self):
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        return FAISS.load_local(
-            self.index_path,
-            embeddings,
-            allow_dangerous_deserialization=True  # ✅ FIXED
-        )
+        # Reuse the index built for this exact text, rebuilding if it was evicted
+        vectorstore = get_store(self.index_path).load(self.index_key, embeddings.get_langchain_embeddings())
+        if vectorstore is None:
+            vectorstore = self.build_vectorstore(self.report_text)
+        return vectorstore
 
+    @metrics.timed_stage("chiki_load_report")
     def load_report(self, file_path):
         self.file_path = file_path
 
@@ -121,31 +80,52 @@ class MedicalReportChatbot:
             self.report_text = "Recommendations loaded."
             return True
 
-        self.report_text = extract_text_from_file(file_path)
-        if not self.report_text or len(self.report_text.strip()) < 10:
+        # Test types are scanned page by page, with the previous page's tail. Nothing is
+        # written to disk: sessions share the working directory, and the text is in report_text.
+        pages, test_types, tail = [], {}, ""
+        try:
+            for text in documents.page_texts(documents.iter_pages(file_path)):
+                pages.append(text)
+                test_types.update(dict.fromkeys(extract_test_types(tail + text)))
+                tail = catalog_matcher.page_tail(text)
+        except Exception as e:
+            print(f"[Extraction Error] {e}")
             return False
+        self.report_text = "".join(pages)
+        if len(self.report_text.strip()) < 10:
+            return False
+        self.test_types = list(test_types)
 
-        self.test_types = extract_test_types(self.report_text)
+        # RAG: load the index cached for this document, building it on a miss
+        self.index_key = index_key(self.report_text, CHUNK_SIZE, CHUNK_OVERLAP, embeddings.model_id())
+        self.set_vectorstore(self.load_vectorstore())
+        return True
 
-        with open("extracted_report.txt", "w", encoding="utf-8") as f:
-            f.write(self.report_text)
+    def set_vectorstore(self, vectorstore):
+        self.vectorstore = vectorstore
+        self.retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
+        self.has_index = True
 
-        # RAG: build or load vectorstore
-        if os.path.exists(self.index_path + "/index.faiss"):
-            vectorstore = self.load_vectorstore()
-        else:
-            vectorstore = self.build_vectorstore(self.report_text)
+    # Session support: the index stays saved in the index store, so dropping it
+    # from memory is cheap and it can be reloaded on the next question.
+    def unload(self):
+        self.vectorstore = None
+        self.retriever = None
 
-        self.retriever = vectorstore.as_retriever(search_kwargs={"k": 4})
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            retriever=self.retriever,
-            return_source_documents=False
-        )
-        return True
+    def ensure_loaded(self):
+        if self.retriever is None and self.has_index:
+            self.set_vectorstore(self.load_vectorstore())
+
+    def memory_bytes(self):
+        if self.vectorstore is None:
+            return len(self.report_text)
+        index = self.vectorstore.index
+        text_bytes = sum(len(doc.page_content) for doc in self.vectorstore.docstore._dict.values())
+        return index.ntotal * index.d * 4 + text_bytes + len(self.report_text)
 
+    @metrics.timed_stage("chiki_process_query")
     def process_query(self, query):
-        if not self.qa_chain:
+        if not self.retriever:
             return "❌ No report loaded."
 
         recommendations_context = json.dumps(self.recommendations, indent=2) if self.recommendations else ""
@@ -170,6 +150,8 @@ Please answer in plain English using paragraph style. Avoid *, markdown, or bull
 """
 
         try:
-            return self.qa_chain.run(formatted_prompt).strip()
+            docs = self.retriever.invoke(formatted_prompt)
+            context = "\n\n".join(doc.page_content for doc in docs)
+            return self.llm(QA_PROMPT.format(context=context, question=formatted_prompt)).strip()
         except Exception as e:
             return f"LLM Error: {str(e)}"
@@ -1,26 +1,41 @@
 from flask import Flask, request, jsonify
 from chiki import MedicalReportChatbot
 from flask_cors import CORS
-import os
+import ingest
+import lazy
+import metrics
+import embeddings
+from sessions import SessionManager
 
 app = Flask(__name__)
 CORS(app)
-chatbot = MedicalReportChatbot(model_name="llama3")  # or "mistral"
+metrics.init_app(app, "chikiai_server")
+ingest.init_app(app)
+# One chatbot per session token instead of a single global report
+sessions = SessionManager(lambda: MedicalReportChatbot(model_name="llama3"))  # or "mistral"
+
+
+def session_token(data=None):
+    return request.headers.get('X-Session-Id') or (data or {}).get('session_id') or request.form.get('session_id')
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
         return jsonify({"error": "No file uploaded"}), 400
 
-    file = request.files['file']
-    filepath = os.path.join("uploads", file.filename)
-    os.makedirs("uploads", exist_ok=True)
-    file.save(filepath)
+    # Content-addressed: sessions uploading the same report share one stored file
+    upload = ingest.get_store().ingest(request.files['file'])
 
-    if chatbot.load_report(filepath):
-        return jsonify({"message": "File uploaded and report loaded successfully"}), 200
+    # Unknown or expired tokens get a fresh session rather than a KeyError
+    with sessions.use_or_create(session_token(), load=False) as (token, chatbot):
+        sessions.reset_index(token)
+        loaded = chatbot.load_report(upload["path"])
+        sessions.mark_loaded(token)
+
+    if loaded:
+        return jsonify({"message": "File uploaded and report loaded successfully", "session_id": token}), 200
     else:
-        return jsonify({"error": "Failed to process report"}), 500
+        return jsonify({"error": "Failed to process report", "session_id": token}), 500
 
 @app.route('/ask', methods=['POST'])
 def ask_question():
@@ -28,10 +43,27 @@ def ask_question():
     if 'question' not in data:
         return jsonify({"error": "Missing 'question' field"}), 400
 
-    question = data['question']
-    response = chatbot.process_query(question)
+    with sessions.use(session_token(data)) as chatbot:
+        if chatbot is None:
+            return jsonify({"error": "Unknown or expired session, upload a report first"}), 404
+        response = chatbot.process_query(data['question'])
     return jsonify({"response": response})
 
+@app.route('/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(sessions.stats())
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({"embeddings": embeddings.stats()})
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    report = lazy.status(["embedding_model"])
+    report["embedding_models"] = embeddings.model_stats()
+    return jsonify(report), 200 if report["ready"] else 503
+
 if __name__ == '__main__':
+    metrics.configure_logging()
+    lazy.warmup_in_background(["embedding_model"])
     app.run(host='0.0.0.0', port=5050, debug=True)
-
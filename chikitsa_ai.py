@@ -1,89 +1,32 @@
 import os
 import sys
-import fitz  # PyMuPDF
-import docx2txt
 import re
 import time
 import json
-import easyocr
-from langchain_community.llms import Ollama
+import llm_client
+import documents
+import catalog_matcher
+from context_index import ChunkIndex
 import readline  # For better terminal input handling
 
-# Initialize EasyOCR reader globally
-reader = easyocr.Reader(['en'])
-
-# Text extraction functions for different file types
-def extract_text_from_pdf(file_path):
-    """Extract text from PDF files"""
-    text = ""
-    try:
-        doc = fitz.open(file_path)
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text()
-        doc.close()
-    except Exception as e:
-        print(f"Error extracting text from PDF: {str(e)}")
-    return text
-
-def extract_text_from_image(file_path):
-    """Extract text from image files using EasyOCR"""
-    try:
-        result = reader.readtext(file_path, detail=0)
-        text = "\n".join(result)
-        return text
-    except Exception as e:
-        print(f"Error extracting text from image: {str(e)}")
-        return ""
-
-def extract_text_from_docx(file_path):
-    """Extract text from Word documents"""
-    try:
-        text = docx2txt.process(file_path)
-        return text
-    except Exception as e:
-        print(f"Error extracting text from Word document: {str(e)}")
-        return ""
-
-def extract_text_from_file(file_path):
-    """Extract text based on file extension"""
-    if not os.path.exists(file_path):
-        return f"Error: File {file_path} not found."
-    
-    file_extension = os.path.splitext(file_path)[1].lower()
-    
-    if file_extension == '.pdf':
-        return extract_text_from_pdf(file_path)
-    elif file_extension in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']:
-        return extract_text_from_image(file_path)
-    elif file_extension in ['.docx', '.doc']:
-        return extract_text_from_docx(file_path)
-    elif file_extension in ['.txt', '.csv']:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            return f.read()
-    elif file_extension == '.json':
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    else:
-        return f"Unsupported file format: {file_extension}"
+# Prompt context budgets, in estimated tokens, for the report and recommendation chunks
+QUESTION_CONTEXT_TOKENS = int(os.environ.get("CHIKITSA_QUESTION_CONTEXT_TOKENS", "1000"))
+SUMMARY_CONTEXT_TOKENS = int(os.environ.get("CHIKITSA_SUMMARY_CONTEXT_TOKENS", "1800"))
+CONTEXT_TOP_K = int(os.environ.get("CHIKITSA_CONTEXT_TOP_K", "6"))
+SUMMARY_QUERY = "abnormal results, diagnosis, impression, key findings and recommendations"
+# Conversation mode keeps Ollama's context between questions, so follow-ups send only what's new
+CONVERSATION_MODE = os.environ.get("CHIKITSA_CONVERSATION", "1") != "0"
 
 def extract_test_types(text):
-    """Extract the types of tests performed from the report text"""
-    test_types = []
-    test_patterns = [
-        r"X-RAY\s+CHEST\s+PA",
-        r"ULTRASOUND\s+SCREENING\s+WHOLE\s+ABDOMEN",
-        r"ECG",
-        r"2D-ECHO\s+WITH\s+COLOUR\s+DOPPLER"
-    ]
-    for pattern in test_patterns:
-        if re.search(pattern, text, re.IGNORECASE):
-            match = re.search(pattern, text, re.IGNORECASE).group(0)
-            test_types.append(match)
-    return test_types
+    """Extract the types of tests performed from the report text, as canonical catalog names"""
+    try:
+        return catalog_matcher.get_catalog().test_names(text)
+    except OSError as e:
+        print(f"Could not load the test catalog: {str(e)}")
+        return []
 
 class MedicalReportChatbot:
-    def __init__(self, model_name=None):
+    def __init__(self, model_name=None, conversation=CONVERSATION_MODE):
         print("\nInitializing Chikitsa AI Medical Report Assistant...")
         if model_name is None:
             try:
@@ -104,7 +47,7 @@ class MedicalReportChatbot:
                 model_name = "llama2"
         self.model_name = model_name
         try:
-            self.llm = Ollama(model=model_name)
+            self.llm = llm_client.OllamaLLM(model_name)
             print(f"Successfully connected to Ollama with model: {model_name}")
         except Exception as e:
             print(f"Error initializing Ollama with model {model_name}: {str(e)}")
@@ -116,6 +59,9 @@ class MedicalReportChatbot:
         self.file_path = ""
         self.test_types = []
         self.recommendations = None
+        self.context_index = None
+        self.conversation = llm_client.OllamaConversation(model_name) if conversation else None
+        self.sent_chunks = set()  # context chunks the conversation already holds
         try:
             if os.path.exists("recommendations.json"):
                 with open("recommendations.json", 'r', encoding='utf-8') as f:
@@ -127,27 +73,95 @@ class MedicalReportChatbot:
     def load_report(self, file_path):
         print(f"Loading medical report from {file_path}...")
         self.file_path = file_path
+        if self.conversation is not None:
+            self.conversation.reset()
         start_time = time.time()
 
         if file_path.endswith('.json'):
             with open(file_path, 'r', encoding='utf-8') as f:
                 self.recommendations = json.load(f)
             self.report_text = "Recommendations data loaded from JSON file."
+            self.context_index = ChunkIndex.from_report("", self.recommendations)
             return True
         else:
-            self.report_text = extract_text_from_file(file_path)
-            if not self.report_text or len(self.report_text.strip()) < 10:
+            # One pass over the pages: each is written out, scanned for tests and
+            # chunked/embedded as it arrives, so every question then picks only its relevant chunks
+            pages, test_types = [], {}
+
+            def report_pages(sink):
+                tail = ""  # end of the previous page, so names split across pages are still found
+                for text in documents.page_texts(documents.iter_pages(file_path), sink=sink):
+                    pages.append(text)
+                    test_types.update(dict.fromkeys(extract_test_types(tail + text)))
+                    tail = catalog_matcher.page_tail(text)
+                    yield text
+
+            try:
+                with open("extracted_report.txt", "w", encoding="utf-8") as f:
+                    context_index = ChunkIndex.from_pages(report_pages(f), self.recommendations)
+            except Exception as e:
+                print(f"Error extracting text from {file_path}: {str(e)}")
+                return False
+            self.report_text = "".join(pages)
+            if len(self.report_text.strip()) < 10:
                 print("Warning: Extracted text is empty or very short.")
                 return False
 
-            self.test_types = extract_test_types(self.report_text)
+            self.test_types = list(test_types)
+            self.context_index = context_index
             print(f"Detected tests in report: {', '.join(self.test_types)}")
             print(f"Successfully extracted {len(self.report_text)} characters in {time.time() - start_time:.2f} seconds")
-            with open("extracted_report.txt", "w", encoding="utf-8") as f:
-                f.write(self.report_text)
+            print(f"Indexed {len(self.context_index.chunks)} context chunks.")
             print("Report loaded successfully.")
             return True
 
+    def build_context(self, query, token_budget):
+        """Report and recommendation chunks most relevant to the query, within token_budget."""
+        if self.context_index is None:
+            self.context_index = ChunkIndex.from_report(self.report_text, self.recommendations)
+        return self.context_index.select(query, token_budget, k=CONTEXT_TOP_K)
+
+    @staticmethod
+    def format_context(chunks):
+        report = "\n...\n".join(text for source, text in chunks if source == "report")
+        recommendations = "\n".join(text for source, text in chunks if source == "recommendations")
+        return report, recommendations
+
+    @staticmethod
+    def follow_up_context(report_context, recommendations_context):
+        context = ""
+        if report_context:
+            context += f"More of the medical report:\n{report_context}\n\n"
+        if recommendations_context:
+            context += f"More recommendations data:\n{recommendations_context}\n\n"
+        return context
+
+    def ask_llm(self, query, token_budget, full_prompt, follow_up_prompt):
+        """Send the full prompt, or in a live conversation only the follow-up and any unseen context.
+
+        full_prompt and follow_up_prompt build the prompt text from (report_context, recommendations_context).
+        """
+        chunks = self.build_context(query, token_budget)
+        if self.conversation is not None and self.conversation.active:
+            new_chunks = [c for c in chunks if c not in self.sent_chunks]
+            try:
+                reply = self.conversation.send(follow_up_prompt(*self.format_context(new_chunks)))
+                self.sent_chunks.update(new_chunks)
+                return reply
+            except Exception as e:
+                # Context rejected or lost (e.g. Ollama restarted): start over with the full prompt
+                print(f"Conversation context unavailable ({str(e)}); resending the report.")
+                self.conversation.reset()
+        prompt = full_prompt(*self.format_context(chunks))
+        try:
+            if self.conversation is None:
+                return self.llm(prompt)
+            reply = self.conversation.send(prompt)
+            self.sent_chunks = set(chunks)
+            return reply
+        except Exception as e:
+            return f"Error: {str(e)}"
+
     def process_query(self, query):
         if not self.report_text:
             return "No medical report loaded. Please load a report first."
@@ -159,69 +173,82 @@ class MedicalReportChatbot:
         else:
             return self.answer_general_query(query)
 
+    def tests_context(self):
+        return "Tests present in this report:\n" + "\n".join(f"- {test}" for test in self.test_types)
+
     def explain_medical_term(self, query):
-        recommendations_context = json.dumps(self.recommendations, indent=2) if self.recommendations else ""
-        tests_context = "Tests present in this report:\n" + "\n".join(f"- {test}" for test in self.test_types)
-        prompt = f"""
+        def full_prompt(report_context, recommendations_context):
+            return f"""
 A patient is asking a question about their medical report. The report contains ONLY the following tests:
 
-{tests_context}
+{self.tests_context()}
 
-Medical Report Content:
-{self.report_text[:5000]}
+Relevant Medical Report Content:
+{report_context}
 
 Additional Recommendations Data (if available):
-{recommendations_context[:2000]}
+{recommendations_context}
 
 Patient Question: {query}
 
 Please explain in simple, patient-friendly language.
 """
-        try:
-            return self.llm(prompt)
-        except Exception as e:
-            return f"Error: {str(e)}"
+
+        def follow_up_prompt(report_context, recommendations_context):
+            return f"""
+{self.follow_up_context(report_context, recommendations_context)}Patient Question: {query}
+
+Please explain in simple, patient-friendly language.
+"""
+
+        return self.ask_llm(query, QUESTION_CONTEXT_TOKENS, full_prompt, follow_up_prompt)
 
     def summarize_report(self):
-        recommendations_context = json.dumps(self.recommendations, indent=2) if self.recommendations else ""
-        tests_context = "Tests present in this report:\n" + "\n".join(f"- {test}" for test in self.test_types)
-        prompt = f"""
+        def full_prompt(report_context, recommendations_context):
+            return f"""
 Summarize the following medical report:
 
-{tests_context}
+{self.tests_context()}
 
 Medical Report Content:
-{self.report_text[:7000]}
+{report_context}
 
 Recommendations:
-{recommendations_context[:2000]}
+{recommendations_context}
+"""
+
+        def follow_up_prompt(report_context, recommendations_context):
+            return f"""
+{self.follow_up_context(report_context, recommendations_context)}Summarize the medical report we have been discussing.
 """
-        try:
-            return self.llm(prompt)
-        except Exception as e:
-            return f"Error: {str(e)}"
+
+        return self.ask_llm(SUMMARY_QUERY, SUMMARY_CONTEXT_TOKENS, full_prompt, follow_up_prompt)
 
     def answer_general_query(self, query):
-        recommendations_context = json.dumps(self.recommendations, indent=2) if self.recommendations else ""
-        tests_context = "Tests present in this report:\n" + "\n".join(f"- {test}" for test in self.test_types)
-        prompt = f"""
+        def full_prompt(report_context, recommendations_context):
+            return f"""
 The patient has asked:
 
 {query}
 
 Tests:
-{tests_context}
+{self.tests_context()}
 
-Medical Report Content:
-{self.report_text[:5000]}
+Relevant Medical Report Content:
+{report_context}
 
 Recommendations:
-{recommendations_context[:2000]}
+{recommendations_context}
 """
-        try:
-            return self.llm(prompt)
-        except Exception as e:
-            return f"Error: {str(e)}"
+
+        def follow_up_prompt(report_context, recommendations_context):
+            return f"""
+{self.follow_up_context(report_context, recommendations_context)}The patient has asked:
+
+{query}
+"""
+
+        return self.ask_llm(query, QUESTION_CONTEXT_TOKENS, full_prompt, follow_up_prompt)
 
 def main():
     print("""
@@ -47,25 +47,50 @@ export default function ChatbotWidget() {
     setInput("")
     setIsTyping(true)
 
-    fetch("http://localhost:5005/api/message", {
+    const botId = (Date.now() + 1).toString()
+    let reply = ""
+
+    // Append streamed tokens to the bot message as they arrive
+    const appendToken = (token: string) => {
+      const isFirst = reply === ""
+      reply += token
+      if (isFirst) {
+        setIsTyping(false)
+        setMessages((prev) => [...prev, { id: botId, content: reply, sender: "bot", timestamp: new Date() }])
+      } else {
+        setMessages((prev) => prev.map((m) => (m.id === botId ? { ...m, content: reply } : m)))
+      }
+    }
+
+    fetch("http://localhost:5005/api/message/stream", {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
       body: JSON.stringify({ message: input }),
     })
-      .then(res => res.json())
-      .then(data => {
-        const botMessage: Message = {
-          id: Date.now().toString(),
-          content: data.reply || "Sorry, I couldn’t understand that.",
-          sender: "bot",
-          timestamp: new Date(),
+      .then(async (res) => {
+        if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`)
+        const reader = res.body.getReader()
+        const decoder = new TextDecoder()
+        let buffer = ""
+        while (true) {
+          const { done, value } = await reader.read()
+          if (done) break
+          buffer += decoder.decode(value, { stream: true })
+          const events = buffer.split("\n\n")
+          buffer = events.pop() || ""
+          for (const event of events) {
+            if (!event.startsWith("data:")) continue
+            const data = JSON.parse(event.slice(5))
+            if (data.token) appendToken(data.token)
+            if (data.error) throw new Error(data.error)
+          }
         }
-        setMessages((prev) => [...prev, botMessage])
-        setIsTyping(false)
+        if (!reply) appendToken("Sorry, I couldn’t understand that.")
       })
       .catch((err) => {
+        if (reply) return
         const botMessage: Message = {
           id: Date.now().toString(),
           content: "Error connecting to medical assistant server.",
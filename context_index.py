@@ -0,0 +1,140 @@
+import os
+import json
+import logging
+import itertools
+from typing import Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+import embeddings
+
+log = logging.getLogger("chikitsa.context_index")
+
+# -------------------- CONFIG --------------------
+CHUNK_CHARS = int(os.environ.get("CHIKITSA_CONTEXT_CHUNK_CHARS", "800"))
+CHARS_PER_TOKEN = 4  # rough average for English text; no tokenizer needed for budgeting
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def iter_lines(texts: Iterable[str]) -> Iterator[str]:
+    """Lines of a stream of text pieces, joining a line that a piece boundary cuts in two."""
+    partial = ""
+    for text in texts:
+        lines = (partial + text).splitlines(keepends=True)
+        partial = lines.pop() if lines and lines[-1] == lines[-1].splitlines()[0] else ""
+        yield from lines
+    if partial:
+        yield partial
+
+
+def iter_chunks(texts: Iterable[str], chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    """Pack whole lines into chunks of at most chunk_chars, hard-splitting only overlong lines.
+
+    texts can be a whole document or a stream of its pages.
+    """
+    current = ""
+    for line in iter_lines(texts):
+        line = line.rstrip()
+        if not line.strip():
+            continue
+        while len(line) > chunk_chars:
+            if current:
+                yield current
+                current = ""
+            yield line[:chunk_chars]
+            line = line[chunk_chars:]
+        if current and len(current) + len(line) + 1 > chunk_chars:
+            yield current
+            current = ""
+        current = f"{current}\n{line}" if current else line
+    if current:
+        yield current
+
+
+def split_chunks(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    return list(iter_chunks([text], chunk_chars))
+
+
+def recommendation_chunks(recommendations, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """One chunk per top-level section of the recommendations JSON, split further if long."""
+    if not recommendations:
+        return []
+    if not isinstance(recommendations, dict):
+        return split_chunks(json.dumps(recommendations, indent=2), chunk_chars)
+    chunks = []
+    for key, value in recommendations.items():
+        chunks.extend(split_chunks(json.dumps({key: value}, indent=2), chunk_chars))
+    return chunks
+
+
+class ChunkIndex:
+    """Embedded chunks of a report and its recommendations, for picking prompt context.
+
+    Built once per report; select() returns the chunks most similar to a question
+    that fit a token budget, in their original order. Without an embedding model
+    it falls back to the leading chunks, i.e. the old truncation.
+
+    chunks may be a generator: they are embedded a batch at a time as they
+    arrive, so a report streamed page by page is never held as one string.
+    """
+
+    def __init__(self, chunks: Iterable[Tuple[str, str]], model_name: str = embeddings.DEFAULT_MODEL,
+                 batch_size: int = embeddings.BATCH_SIZE):
+        self.chunks: List[Tuple[str, str]] = []  # (source, text) with source "report" or "recommendations"
+        self.model_name = model_name
+        self.vectors: Optional[np.ndarray] = None
+        batches, pending, embedding = [], [], True
+        for chunk in chunks:
+            self.chunks.append(chunk)
+            pending.append(chunk[1])
+            if len(pending) >= batch_size:
+                embedding = embedding and self._embed(pending, batches)
+                pending = []
+        if pending and embedding:
+            embedding = self._embed(pending, batches)
+        if embedding and batches:
+            vectors = np.vstack(batches)
+            self.vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+    def _embed(self, texts: List[str], batches: List[np.ndarray]) -> bool:
+        try:
+            batches.append(embeddings.encode_cached(texts, self.model_name))
+            return True
+        except Exception as e:
+            log.warning("Context index falling back to leading chunks: %s", e)
+            return False
+
+    @classmethod
+    def from_pages(cls, pages: Iterable[str], recommendations=None, model_name: str = embeddings.DEFAULT_MODEL):
+        """Index report text given as a stream of page texts, then the recommendations."""
+        chunks = (("report", c) for c in iter_chunks(pages))
+        rec_chunks = (("recommendations", c) for c in recommendation_chunks(recommendations))
+        return cls(itertools.chain(chunks, rec_chunks), model_name)
+
+    @classmethod
+    def from_report(cls, report_text: str, recommendations=None, model_name: str = embeddings.DEFAULT_MODEL):
+        return cls.from_pages([report_text or ""], recommendations, model_name)
+
+    def rank(self, query: str) -> List[int]:
+        if self.vectors is None or not query:
+            return list(range(len(self.chunks)))
+        try:
+            query_vector = np.asarray(embeddings.encode([query], self.model_name), dtype=np.float32)[0]
+        except Exception as e:
+            log.warning("Context ranking skipped: %s", e)
+            return list(range(len(self.chunks)))
+        return [int(i) for i in np.argsort(-(self.vectors @ query_vector), kind="stable")]
+
+    def select(self, query: str, token_budget: int, k: int = None) -> List[Tuple[str, str]]:
+        """Top-ranked (source, text) chunks that fit token_budget, in document order."""
+        picked, used = [], 0
+        for i in self.rank(query):
+            cost = estimate_tokens(self.chunks[i][1])
+            if used + cost > token_budget:
+                continue
+            picked.append(i)
+            used += cost
+            if k and len(picked) >= k:
+                break
+        return [self.chunks[i] for i in sorted(picked)]
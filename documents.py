@@ -0,0 +1,244 @@
+import os
+import time
+import logging
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator
+from xml.etree import ElementTree
+import fitz  # PyMuPDF
+import ocr
+import ocr_cache
+import metrics
+
+log = logging.getLogger("chikitsa.documents")
+
+# -------------------- CONFIG --------------------
+MIN_PAGE_TEXT = 10  # pages with fewer text-layer characters are OCR'd
+OCR_LOOKAHEAD = int(os.environ.get("CHIKITSA_OCR_LOOKAHEAD", str(2 * ocr.OCR_WORKERS)))  # pages held while OCR runs
+TEXT_PAGE_CHARS = 4000  # DOCX and plain text have no pages; cut them at paragraph/line boundaries near this size
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif"}
+DOCX_EXTENSIONS = {".docx"}  # legacy binary .doc is not a zip archive and is rejected as unsupported
+TEXT_EXTENSIONS = {".txt", ".csv"}
+# Leading bytes of the binary formats, so stored uploads are read by what they are, not by their name
+MAGIC_EXTENSIONS = [(b"%PDF-", ".pdf"), (b"\x89PNG\r\n\x1a\n", ".png"), (b"\xff\xd8\xff", ".jpg"),
+                    (b"II*\x00", ".tif"), (b"MM\x00*", ".tif"), (b"BM", ".bmp")]
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def page_record(page: int, text: str, ocr_used: bool = False, extract_seconds: float = 0.0,
+                ocr_seconds: float = 0.0) -> Dict:
+    return {"page": page, "text": text, "ocr": ocr_used, "ocr_cached": False, "dpi": None,
+            "extract_seconds": extract_seconds, "ocr_seconds": ocr_seconds}
+
+
+def _timed_ocr(image):
+    start = time.perf_counter()
+    return ocr.ocr_image(image), time.perf_counter() - start
+
+
+def _cached_ocr(record: Dict, key_fn, run):
+    """ocr_result for _emit: the cached OCR text for key_fn(), or run() stored under that key."""
+    cache = ocr_cache.get_cache()
+    key = key_fn() if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        record["ocr_cached"], record["dpi"] = True, cached["dpi"]
+        return lambda: (cached["text"], 0.0)
+
+    def finish():
+        text, seconds = run()
+        if cache is not None:
+            try:
+                cache.put(key, text, record["dpi"], seconds)
+            except Exception as e:  # e.g. "database is locked"; the OCR text is still good
+                log.warning("OCR cache write failed on page %d: %s", record["page"], e)
+        return text, seconds
+    return finish
+
+
+def _start_pdf_ocr(pool: ThreadPoolExecutor, doc, page_num: int, record: Dict):
+    """Render a page at OCR_DPI and queue its OCR, unless the same render was OCR'd before.
+
+    The returned callable waits for the result and, if it is too sparse for the
+    page's size, re-renders at OCR_HIGH_DPI and OCRs again before caching it.
+    """
+    image = ocr.render_page(doc.load_page(page_num), ocr.OCR_DPI)
+    record["dpi"] = ocr.OCR_DPI
+    future = None
+
+    def run():
+        text, seconds = future.result()
+        page = doc.load_page(page_num)
+        if ocr.needs_high_dpi(text, page, record["dpi"]):
+            # Rendering must stay on the generator's thread; the second pass is rare enough to run inline
+            high_text, high_seconds = _timed_ocr(ocr.render_page(page, ocr.OCR_HIGH_DPI))
+            seconds += high_seconds
+            if len(high_text.strip()) >= len(text.strip()):
+                text, record["dpi"] = high_text, ocr.OCR_HIGH_DPI
+        return text, seconds
+
+    ocr_result = _cached_ocr(record, lambda: ocr_cache.image_key(image), run)
+    if not record["ocr_cached"]:
+        future = pool.submit(_timed_ocr, image)
+    return ocr_result
+
+
+def iter_pdf_pages(pdf_path: str, workers: int = ocr.OCR_WORKERS, lookahead: int = OCR_LOOKAHEAD) -> Iterator[Dict]:
+    """Page records in order, OCR'ing near-empty pages on a worker pool.
+
+    Rendering stays on the calling thread (PyMuPDF documents are not thread-safe);
+    only the EasyOCR calls run in parallel. At most `lookahead` pages are held
+    while their OCR finishes, so a long scanned report never sits in memory whole.
+    """
+    doc = fitz.open(pdf_path)
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    window = deque()  # (record, callable returning its OCR text and seconds, or None)
+    try:
+        for page_num in range(len(doc)):
+            start = time.perf_counter()
+            page = doc.load_page(page_num)
+            record = page_record(page_num + 1, page.get_text())
+            ocr_result = None
+            if len(record["text"].strip()) < MIN_PAGE_TEXT:
+                record["ocr"] = True
+                ocr_result = _start_pdf_ocr(pool, doc, page_num, record)
+            record["extract_seconds"] = time.perf_counter() - start
+            window.append((record, ocr_result))
+            while len(window) > max(1, lookahead) or (window and window[0][1] is None):
+                yield _emit(*window.popleft())
+        while window:
+            yield _emit(*window.popleft())
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        doc.close()
+
+
+def _emit(record: Dict, ocr_result=None) -> Dict:
+    """Finish a record (waiting on ocr_result() for its OCR text, if any) and count it."""
+    if ocr_result is not None:
+        try:
+            text, record["ocr_seconds"] = ocr_result()
+            record["text"] += text
+        except Exception as e:
+            # A page that can't be OCR'd keeps whatever its text layer had
+            log.warning("OCR failed on page %d: %s", record["page"], e)
+            record["ocr"] = False
+    method = "ocr_cached" if record["ocr_cached"] else "ocr" if record["ocr"] else "text"
+    metrics.OCR_PAGES.inc(method=method)
+    metrics.PAGE_SECONDS.observe(record["extract_seconds"] + record["ocr_seconds"], method=method)
+    return record
+
+
+def iter_image_pages(file_path: str) -> Iterator[Dict]:
+    record = page_record(1, "", ocr_used=True)
+    yield _emit(record, _cached_ocr(record, lambda: ocr_cache.file_key(file_path), lambda: _timed_ocr(file_path)))
+
+
+def _cut_pages(paragraphs: Iterable[str], page_chars: int = TEXT_PAGE_CHARS) -> Iterator[Dict]:
+    """Group paragraphs (None marks a hard page break) into page records of about page_chars."""
+    page, parts, size, start = 1, [], 0, time.perf_counter()
+    for paragraph in paragraphs:
+        if paragraph is not None:
+            parts.append(paragraph)
+            size += len(paragraph)
+        if parts and (paragraph is None or size >= page_chars):
+            yield _emit(page_record(page, "".join(parts), extract_seconds=time.perf_counter() - start))
+            page, parts, size, start = page + 1, [], 0, time.perf_counter()
+    if parts:
+        yield _emit(page_record(page, "".join(parts), extract_seconds=time.perf_counter() - start))
+
+
+def _docx_paragraphs(file_path: str) -> Iterator[str]:
+    """Body paragraphs of a .docx, streamed from word/document.xml; None at explicit page breaks."""
+    with zipfile.ZipFile(file_path) as archive, archive.open("word/document.xml") as xml:
+        parts = []
+        for event, element in ElementTree.iterparse(xml, events=("start", "end")):
+            if event == "start":
+                if element.tag == f"{W}lastRenderedPageBreak" or (
+                        element.tag == f"{W}br" and element.get(f"{W}type") == "page"):
+                    if parts:
+                        yield "".join(parts)
+                        parts = []
+                    yield None
+                continue
+            if element.tag == f"{W}t":
+                parts.append(element.text or "")
+            elif element.tag == f"{W}tab":
+                parts.append("\t")
+            elif element.tag in (f"{W}br", f"{W}cr") and element.get(f"{W}type") != "page":
+                parts.append("\n")
+            elif element.tag == f"{W}p":
+                parts.append("\n")
+                yield "".join(parts)
+                parts = []
+                element.clear()
+        if parts:
+            yield "".join(parts)
+
+
+def iter_docx_pages(file_path: str) -> Iterator[Dict]:
+    return _cut_pages(_docx_paragraphs(file_path))
+
+
+def iter_text_pages(file_path: str) -> Iterator[Dict]:
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        yield from _cut_pages(f)
+
+
+def file_format(file_path: str) -> str:
+    """Extension for the reader to use: from the file's leading bytes for PDFs and images, else its name."""
+    with open(file_path, "rb") as f:
+        head = f.read(8)
+    for magic, ext in MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return ext
+    return os.path.splitext(file_path)[1].lower()
+
+
+def iter_pages(file_path: str, workers: int = ocr.OCR_WORKERS) -> Iterator[Dict]:
+    """Stream a report as page records: {page, text, ocr, ocr_cached, dpi, extract_seconds, ocr_seconds}.
+
+    PDFs yield one record per page (OCR'd when the text layer is empty), images
+    a single OCR'd record, DOCX and plain text ~TEXT_PAGE_CHARS slices. The type
+    comes from the file's contents where they identify it, so uploads stored
+    without an extension still open. Raises FileNotFoundError or ValueError for
+    a missing or unsupported file.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File {file_path} not found.")
+    ext = file_format(file_path)
+    if ext in PDF_EXTENSIONS:
+        return iter_pdf_pages(file_path, workers)
+    if ext in IMAGE_EXTENSIONS:
+        return iter_image_pages(file_path)
+    if ext in DOCX_EXTENSIONS:
+        return iter_docx_pages(file_path)
+    if ext in TEXT_EXTENSIONS:
+        return iter_text_pages(file_path)
+    raise ValueError(f"Unsupported file format: {ext}")
+
+
+def page_texts(pages: Iterable[Dict], sink=None, stats: Dict = None) -> Iterator[str]:
+    """Text of each page record, also written to `sink` (an open text file) if given.
+
+    If a stats dict is passed it is filled with page, OCR, OCR cache and high-DPI counts.
+    """
+    for page in pages:
+        if sink is not None:
+            sink.write(page["text"])
+        if stats is not None:
+            stats["pages"] = stats.get("pages", 0) + 1
+            stats["ocr"] = stats.get("ocr", 0) + page["ocr"]
+            stats["ocr_cached"] = stats.get("ocr_cached", 0) + page["ocr_cached"]
+            stats["high_dpi"] = stats.get("high_dpi", 0) + (page["dpi"] == ocr.OCR_HIGH_DPI)
+            stats["ocr_seconds"] = stats.get("ocr_seconds", 0.0) + page["ocr_seconds"]
+        yield page["text"]
+
+
+def extract_text(file_path: str) -> str:
+    """Whole-document text, for callers that need it as one string."""
+    return "".join(page_texts(iter_pages(file_path)))
@@ -0,0 +1,101 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import List, Dict, Optional
+import numpy as np
+import metrics
+
+# -------------------- CONFIG --------------------
+CACHE_PATH = os.environ.get("CHIKITSA_EMBEDDING_CACHE", "cache/embeddings.sqlite")
+MAX_ENTRIES = int(os.environ.get("CHIKITSA_EMBEDDING_CACHE_MAX", "500000"))
+
+
+def content_key(model_name: str, content: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{content}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk embedding store keyed by content hash, bounded by entry count with LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, dim INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, dim FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob, dim in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32, count=dim)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        metrics.cache_event("embedding", hit=True, count=len(found))
+        metrics.cache_event("embedding", hit=False, count=len(keys) - len(found))
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vector in items.items():
+            vector = np.asarray(vector, dtype=np.float32)
+            rows.append((key, vector.tobytes(), vector.shape[0], now))
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": size, "max_entries": self.max_entries}
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
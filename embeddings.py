@@ -0,0 +1,153 @@
+import time
+import logging
+import threading
+import os
+from typing import List, Dict
+import numpy as np
+import lazy
+from embedding_cache import content_key, get_cache
+
+sentence_transformers = lazy.lazy_import("sentence_transformers")
+onnx_embedder = lazy.lazy_import("onnx_embedder")
+log = logging.getLogger("chikitsa.embeddings")
+
+# -------------------- CONFIG --------------------
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+BATCH_SIZE = int(os.environ.get("CHIKITSA_EMBEDDING_BATCH_SIZE", "64"))
+# "torch" runs the SentenceTransformer; "onnx-int8" runs the quantized export made by
+# `python onnx_embedder.py` (see benchmarks/bench_embeddings.py for parity and speed)
+BACKEND = os.environ.get("CHIKITSA_EMBEDDING_BACKEND", "torch")
+BACKENDS = ("torch", "onnx-int8")
+
+# One model per (model name, backend) for the whole process.
+_lock = threading.Lock()
+_models = {}
+_stats = {}
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def model_id(model_name: str = DEFAULT_MODEL, backend: str = None) -> str:
+    """Name for the vectors a model produces on a backend.
+
+    Caches, saved indexes and the knowledge base key on this, so switching
+    backends never mixes int8 and full-precision vectors.
+    """
+    backend = backend or BACKEND
+    return model_name if backend == "torch" else f"{model_name}@{backend}"
+
+
+def _load(model_name: str, backend: str):
+    if backend == "torch":
+        return sentence_transformers.SentenceTransformer(model_name)
+    if backend == "onnx-int8":
+        return onnx_embedder.OnnxEncoder(onnx_embedder.model_dir(model_name))
+    raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+
+
+def _get_or_load(model_name: str, backend: str):
+    model = _models.get((model_name, backend))
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get((model_name, backend))
+        if model is None:
+            name = model_id(model_name, backend)
+            rss_before = _rss_mb()
+            start = time.perf_counter()
+            model = _load(model_name, backend)
+            _stats[name] = {
+                "load_seconds": round(time.perf_counter() - start, 3),
+                "memory_mb": round(_rss_mb() - rss_before, 1),
+            }
+            log.info("Loaded embedding model %s in %.3fs (+%.1f MB)", name, _stats[name]["load_seconds"],
+                     _stats[name]["memory_mb"])
+            _models[(model_name, backend)] = model
+    return model
+
+
+def get_model(model_name: str = DEFAULT_MODEL, backend: str = None):
+    """Return the shared model, loading it on first use.
+
+    The default model loads through its lazy resource whoever asks first, so
+    readiness reports it as loaded after a lazy load as well as after warm-up.
+    """
+    backend = backend or BACKEND
+    if (model_name, backend) == (DEFAULT_MODEL, BACKEND):
+        return _default_model.get()
+    return _get_or_load(model_name, backend)
+
+
+def encode(texts, model_name: str = DEFAULT_MODEL, backend: str = None, **kwargs):
+    return get_model(model_name, backend).encode(texts, **kwargs)
+
+
+def encode_cached(texts: List[str], model_name: str = DEFAULT_MODEL, batch_size: int = BATCH_SIZE,
+                  backend: str = None) -> np.ndarray:
+    """Encode texts in batches, reusing vectors from the on-disk cache where possible."""
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+    cache = get_cache()
+    name = model_id(model_name, backend)
+    keys = [content_key(name, t) for t in texts]
+    cached = cache.get_many(list(dict.fromkeys(keys)))
+    missing = list(dict.fromkeys(t for t, k in zip(texts, keys) if k not in cached))
+    if missing:
+        vectors = encode(missing, model_name, backend, batch_size=batch_size)
+        fresh = {content_key(name, t): v for t, v in zip(missing, vectors)}
+        cache.put_many(fresh)
+        cached.update(fresh)
+    return np.vstack([cached[k] for k in keys]).astype(np.float32)
+
+
+def warmup(model_name: str = DEFAULT_MODEL):
+    """Load the model and run one encode so the first request doesn't pay for it."""
+    encode(["warmup"], model_name)
+
+
+def model_stats() -> Dict:
+    """Load time and memory of each model loaded so far, by model_id."""
+    return {name: dict(info) for name, info in _stats.items()}
+
+
+def stats() -> Dict:
+    return {"models": model_stats(), "cache": get_cache().stats()}
+
+
+def _load_default_model():
+    model = _get_or_load(DEFAULT_MODEL, BACKEND)
+    model.encode(["warmup"])  # the first encode pays one-off setup costs
+    return model
+
+
+_default_model = lazy.register("embedding_model", _load_default_model)
+
+_adapter_class = None
+
+
+def get_langchain_embeddings(model_name: str = DEFAULT_MODEL):
+    """LangChain adapter over the shared model, a drop-in for HuggingFaceEmbeddings."""
+    global _adapter_class
+    if _adapter_class is None:
+        # Imported here so langchain isn't loaded by modules that never build a vector store
+        from langchain_core.embeddings import Embeddings
+
+        class SharedEmbeddings(Embeddings):
+            def __init__(self, model_name: str = DEFAULT_MODEL):
+                self.model_name = model_name
+
+            def embed_documents(self, texts: List[str]) -> List[List[float]]:
+                return encode(texts, self.model_name).tolist()
+
+            def embed_query(self, text: str) -> List[float]:
+                return encode(text, self.model_name).tolist()
+
+        _adapter_class = SharedEmbeddings
+    return _adapter_class(model_name)
@@ -0,0 +1,116 @@
+import os
+import time
+import pickle
+import shutil
+import hashlib
+import threading
+from typing import Dict, Optional
+import lazy
+import metrics
+
+faiss = lazy.lazy_import("faiss")
+vectorstores = lazy.lazy_import("langchain_community.vectorstores")
+
+# -------------------- CONFIG --------------------
+MAX_STORE_MB = float(os.environ.get("CHIKITSA_INDEX_STORE_MB", "2048"))
+MAX_AGE_DAYS = float(os.environ.get("CHIKITSA_INDEX_MAX_AGE_DAYS", "30"))
+
+
+def index_key(text: str, chunk_size: int, chunk_overlap: int, model_name: str) -> str:
+    """Key an index by the document and everything that shapes its vectors."""
+    digest = hashlib.sha256()
+    digest.update(f"{chunk_size}\0{chunk_overlap}\0{model_name}\0".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class FaissIndexStore:
+    """FAISS indexes saved per document key, evicted by total size and age of last use."""
+
+    def __init__(self, base_dir: str, max_bytes: int = int(MAX_STORE_MB * 1024 * 1024),
+                 max_age_seconds: float = MAX_AGE_DAYS * 86400):
+        self.base_dir = base_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        os.makedirs(base_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_dir, key)
+
+    def _read(self, path: str):
+        index_file = os.path.join(path, "index.faiss")
+        try:
+            index = faiss.read_index(index_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type can be memory-mapped
+            index = faiss.read_index(index_file)
+        # index.pkl is written by save() below, never taken from user input
+        with open(os.path.join(path, "index.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        os.utime(path)  # last-use time drives age and LRU eviction
+        return index, docstore, index_to_docstore_id
+
+    def load(self, key: str, embedding_function):
+        """The saved index for key, or None. An index evicted mid-read (by another process) counts as a miss."""
+        path = self._path(key)
+        loaded = None
+        with self._lock:
+            if os.path.exists(os.path.join(path, "index.faiss")):
+                try:
+                    loaded = self._read(path)
+                except (OSError, RuntimeError, EOFError, pickle.UnpicklingError):
+                    loaded = None
+        metrics.cache_event("faiss_index", hit=loaded is not None)
+        if loaded is None:
+            return None
+        return vectorstores.FAISS(embedding_function, *loaded)
+
+    def save(self, key: str, vectorstore):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        vectorstore.save_local(tmp_path)
+        with self._lock:
+            if os.path.exists(path):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            else:
+                os.replace(tmp_path, path)
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.base_dir):
+            path = os.path.join(self.base_dir, name)
+            if name.endswith(".tmp") or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Drop indexes unused for longer than max age, then least recently used ones over the size cap."""
+        now = time.time()
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for last_used, size, path in entries:
+                if now - last_used <= self.max_age_seconds and total <= self.max_bytes:
+                    break
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._entries()
+        return {"indexes": len(entries), "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes}
+
+
+_stores: Dict[str, FaissIndexStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(base_dir: str) -> FaissIndexStore:
+    with _stores_lock:
+        if base_dir not in _stores:
+            _stores[base_dir] = FaissIndexStore(base_dir)
+        return _stores[base_dir]
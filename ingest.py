@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Optional
+from werkzeug.exceptions import RequestEntityTooLarge
+from flask import Request, jsonify
+import metrics
+
+# -------------------- CONFIG --------------------
+UPLOAD_DIR = os.environ.get("CHIKITSA_UPLOAD_DIR", "uploads")
+MAX_UPLOAD_MB = float(os.environ.get("CHIKITSA_MAX_UPLOAD_MB", "25"))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+MULTIPART_OVERHEAD = 64 * 1024  # form fields and part headers on top of the file itself
+CHUNK_SIZE = 1 << 20
+# Stored objects keep the uploaded name's extension only if it is one the readers handle
+STORED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif", ".docx", ".txt", ".csv", ".json"}
+
+
+class HashingUpload:
+    """File object an upload is streamed into: hashes and size-checks each chunk as it is written.
+
+    The bytes go straight to a temp file inside the content store, so committing
+    the upload is a rename (or, for a duplicate, just deleting the temp file).
+    """
+
+    def __init__(self, store: "ContentStore", max_bytes: int = MAX_UPLOAD_BYTES):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.committed = False
+        fd, self.temp_path = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "w+b")
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.close()  # the parser drops the part on error, so nothing else would remove the temp file
+            raise RequestEntityTooLarge(f"Upload exceeds {MAX_UPLOAD_MB:g} MB")
+        self.digest.update(data)
+        return self._file.write(data)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __getattr__(self, name):
+        # read/seek/tell etc. for werkzeug's FileStorage
+        return getattr(self._file, name)
+
+
+class ContentStore:
+    """Uploads stored once per SHA-256 under objects/<2 hex>/<hash><ext>, with a JSON sidecar.
+
+    A repeat upload of the same bytes only updates the sidecar (filenames seen,
+    upload count, last seen); the stored file and its hash are reused.
+    """
+
+    def __init__(self, base_dir: str = UPLOAD_DIR):
+        self.base_dir = base_dir
+        self.tmp_dir = os.path.join(base_dir, "tmp")
+        self._lock = threading.Lock()
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _meta_path(self, sha256: str) -> str:
+        return os.path.join(self.base_dir, "objects", sha256[:2], f"{sha256}.json")
+
+    def lookup(self, sha256: str) -> Optional[Dict]:
+        try:
+            with open(self._meta_path(sha256), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, record: Dict):
+        path = self._meta_path(record["sha256"])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def commit(self, upload: HashingUpload, filename: str) -> Dict:
+        """Move a finished upload into the store; returns its record with a `duplicate` flag."""
+        upload._file.flush()
+        sha256 = upload.digest.hexdigest()
+        # From the raw name: secure_filename drops non-ASCII stems, turning "лаб.pdf" into "pdf"
+        ext = os.path.splitext(filename or "")[1].lower()
+        ext = ext if ext in STORED_EXTENSIONS else ""
+        now = time.time()
+        with self._lock:
+            record = self.lookup(sha256)
+            duplicate = record is not None and os.path.exists(record["path"])
+            if duplicate:
+                upload.close()
+            else:
+                path = os.path.join(self.base_dir, "objects", sha256[:2], sha256 + ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                upload._file.close()
+                os.replace(upload.temp_path, path)
+                upload.committed = True
+                record = {"sha256": sha256, "path": path, "size": upload.size, "filenames": [],
+                          "first_seen": now, "uploads": 0}
+            if filename and filename not in record["filenames"]:
+                record["filenames"].append(filename)
+            record["uploads"] += 1
+            record["last_seen"] = now
+            self._write_meta(record)
+        metrics.cache_event("upload_store", hit=duplicate)
+        return {**record, "duplicate": duplicate}
+
+    def ingest(self, file_storage, filename: Optional[str] = None) -> Dict:
+        """Store a werkzeug FileStorage, hashing it on the way in if it was not streamed already.
+
+        `filename` overrides the client's name, e.g. with a default when it sent none.
+        """
+        upload = file_storage.stream
+        if not isinstance(upload, HashingUpload):
+            upload = HashingUpload(self)
+            try:
+                file_storage.stream.seek(0)
+                for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b""):
+                    upload.write(chunk)
+            except Exception:
+                upload.close()
+                raise
+        return self.commit(upload, filename or file_storage.filename)
+
+
+_stores: Dict[str, ContentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(base_dir: str = UPLOAD_DIR) -> ContentStore:
+    with _stores_lock:
+        if base_dir not in _stores:
+            _stores[base_dir] = ContentStore(base_dir)
+        return _stores[base_dir]
+
+
+class StreamingRequest(Request):
+    """Writes multipart file parts straight into the content store while they are parsed."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingUpload(get_store())
+
+
+def init_app(app):
+    """Stream uploads through the content store and reject oversized bodies before reading them."""
+    app.request_class = StreamingRequest
+    # Checked against Content-Length up front; HashingUpload enforces the per-file limit while streaming
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def too_large(e):
+        return jsonify({"error": f"Upload too large (limit {MAX_UPLOAD_MB:g} MB)"}), 413
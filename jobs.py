@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# -------------------- CONFIG --------------------
+# Job threads mostly wait on Extract's stage pipeline, which caps the actual
+# CPU and LLM concurrency; enough of them keeps every stage fed
+JOB_WORKERS = int(os.environ.get("CHIKITSA_JOB_WORKERS", "8"))
+MAX_PENDING_JOBS = int(os.environ.get("CHIKITSA_MAX_PENDING_JOBS", "32"))
+JOB_RETENTION_SECONDS = int(os.environ.get("CHIKITSA_JOB_RETENTION_SECONDS", str(24 * 3600)))
+MAX_RETAINED_JOBS = int(os.environ.get("CHIKITSA_MAX_RETAINED_JOBS", "1000"))
+JOB_DIR = os.environ.get("CHIKITSA_JOB_DIR", "extracted_results/jobs")
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class JobStore:
+    """In-memory job records with per-job output directories, expired by age and count."""
+
+    def __init__(self, base_dir: str = JOB_DIR, retention_seconds: int = JOB_RETENTION_SECONDS,
+                 max_jobs: int = MAX_RETAINED_JOBS):
+        self.base_dir = base_dir
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        os.makedirs(base_dir, exist_ok=True)
+
+    def create(self, **meta) -> Dict:
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "output_dir": os.path.join(self.base_dir, job_id),
+            "result": None,
+            "error": None,
+            **meta,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self.purge()
+        return job
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def latest_finished(self) -> Optional[Dict]:
+        with self._lock:
+            finished = [j for j in self._jobs.values() if j["status"] in (DONE, FAILED)]
+            return dict(max(finished, key=lambda j: j["finished_at"])) if finished else None
+
+    def purge(self):
+        """Drop finished jobs past the retention window, then the oldest beyond max_jobs."""
+        now = time.time()
+        with self._lock:
+            finished = sorted(
+                (j for j in self._jobs.values() if j["status"] in (DONE, FAILED)),
+                key=lambda j: j["finished_at"],
+            )
+            expired = [j for j in finished if now - j["finished_at"] > self.retention_seconds]
+            overflow = len(self._jobs) - len(expired) - self.max_jobs
+            if overflow > 0:
+                expired_ids = {j["job_id"] for j in expired}
+                expired += [j for j in finished if j["job_id"] not in expired_ids][:overflow]
+            for job in expired:
+                del self._jobs[job["job_id"]]
+        for job in expired:
+            shutil.rmtree(job["output_dir"], ignore_errors=True)
+
+
+class JobQueue:
+    """Bounded worker pool; submissions beyond MAX_PENDING_JOBS are rejected instead of piling up."""
+
+    def __init__(self, store: JobStore, workers: int = JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS):
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(self, fn: Callable, *args, **meta) -> Dict:
+        """Queue fn(*args, output_dir=...) and return the new job record."""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull("Too many jobs in progress, try again later.")
+        job = self.store.create(**meta)
+        try:
+            # Run in a copy of the caller's context so the request's trace id follows the job
+            context = contextvars.copy_context()
+            self._pool.submit(context.run, self._run, job["job_id"], job["output_dir"], fn, args)
+        except Exception:
+            self._slots.release()
+            raise
+        return job
+
+    def _run(self, job_id: str, output_dir: str, fn: Callable, args):
+        try:
+            self.store.update(job_id, status=RUNNING, started_at=time.time())
+            os.makedirs(output_dir, exist_ok=True)
+            result = fn(*args, output_dir=output_dir)
+            self.store.update(job_id, status=DONE, result=result, finished_at=time.time())
+        except Exception as e:
+            self.store.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        finally:
+            self._slots.release()
@@ -0,0 +1,207 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import List, Dict, Optional
+import pandas as pd
+import embeddings
+import lazy
+from prefilter import build_search_column
+
+lancedb = lazy.lazy_import("lancedb")
+log = logging.getLogger("chikitsa.knowledge_base")
+
+# -------------------- CONFIG --------------------
+KB_DIR = os.environ.get("CHIKITSA_KB_DIR", "knowledge_base")
+TABLE_NAME = "medical_knowledge"
+MANIFEST_FILE = "manifest.json"
+EMBEDDING_MODEL = embeddings.DEFAULT_MODEL
+SYNC_CHUNK_SIZE = 4096
+
+# Always present in the table; used when no dataset row matches a request.
+FALLBACK_MEDICINES = [
+    {"Medicine": "Metformin", "Indications": "Diabetes", "SideEffects": "GI upset", "Substitutes": "Sitagliptin", "Price": "Low", "Dosage": "500mg twice daily"},
+    {"Medicine": "Cyanocobalamin", "Indications": "B12 deficiency", "SideEffects": "Injection site pain", "Substitutes": "Hydroxocobalamin", "Price": "Moderate", "Dosage": "1000 mcg weekly IM"},
+    {"Medicine": "Cholecalciferol", "Indications": "Vitamin D deficiency", "SideEffects": "None", "Substitutes": "Ergocalciferol", "Price": "Low", "Dosage": "60,000 IU weekly"},
+    {"Medicine": "Cetirizine", "Indications": "Allergy", "SideEffects": "Drowsiness", "Substitutes": "Loratadine", "Price": "Low", "Dosage": "10mg once daily"},
+]
+
+_lock = threading.Lock()
+_knowledge_bases = {}  # absolute kb_dir -> KnowledgeBase of the dataset its one table holds
+_dataset_hashes = {}  # (path, size, mtime) -> sha256
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_content(row: Dict) -> str:
+    return f"Medicine: {row.get('Medicine')}\nIndications: {row.get('Indications')}\nSide Effects: {row.get('SideEffects')}\nSubstitutes: {row.get('Substitutes')}\nPrice: {row.get('Price')}\nDosage: {row.get('Dosage', 'Not specified')}"
+
+
+def _row_id(content: str, search_text: str) -> str:
+    return hashlib.sha1(f"{content}\0{search_text}".encode("utf-8")).hexdigest()
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _sql_list(values) -> str:
+    return ", ".join(_sql_string(v) for v in values)
+
+
+def _keyword_filter(keywords: List[str]) -> Optional[str]:
+    """LanceDB filter for dataset rows whose search text contains any keyword (as prefilter.match_rows)."""
+    keywords = sorted({k.lower() for k in keywords if k})
+    if not keywords:
+        return None
+    likes = " OR ".join(f"search_text LIKE {_sql_string('%' + k + '%')}" for k in keywords)
+    return f"source = 'dataset' AND ({likes})"
+
+
+def _read_columns(table, columns: List[str]):
+    """Only the given columns of every row, as Arrow, leaving the vectors on disk."""
+    return table.search().select(columns).limit(max(1, table.count_rows())).to_arrow()
+
+
+def _read_manifest(kb_dir: str) -> Dict:
+    path = os.path.join(kb_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(kb_dir: str, manifest: Dict):
+    """Atomically replace the manifest; a no-op when it is unchanged (batch workers all open the KB)."""
+    if _read_manifest(kb_dir) == manifest:
+        return
+    path = os.path.join(kb_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _dataset_records(dataset_path: str) -> Dict[str, Dict]:
+    df = pd.read_csv(dataset_path, low_memory=False)
+    fallback = pd.DataFrame(FALLBACK_MEDICINES)
+    records = {}
+    for source, frame in (("dataset", df), ("fallback", fallback)):
+        search_column = build_search_column(frame)
+        for row, search_text in zip(frame.to_dict("records"), search_column):
+            content = row_content(row)
+            row_id = _row_id(content, search_text)
+            records[row_id] = {"id": row_id, "content": content, "search_text": search_text, "source": source}
+    return records
+
+
+def _sync_table(db, dataset_path: str, batch_size: int = 500):
+    """Bring the LanceDB table in line with the dataset, embedding only new rows."""
+    wanted = _dataset_records(dataset_path)
+    table = db.open_table(TABLE_NAME) if TABLE_NAME in db.table_names() else None
+    existing = set(_read_columns(table, ["id"]).column("id").to_pylist()) if table is not None else set()
+
+    stale = sorted(existing - wanted.keys())
+    for i in range(0, len(stale), batch_size):
+        table.delete(f"id IN ({_sql_list(stale[i:i + batch_size])})")
+
+    fresh = [wanted[row_id] for row_id in wanted.keys() - existing]
+    for i in range(0, len(fresh), SYNC_CHUNK_SIZE):
+        chunk = fresh[i:i + SYNC_CHUNK_SIZE]
+        vectors = embeddings.encode_cached([r["content"] for r in chunk], EMBEDDING_MODEL)
+        for record, vector in zip(chunk, vectors):
+            record["vector"] = vector.tolist()
+        if table is None:
+            table = db.create_table(TABLE_NAME, data=chunk)
+        else:
+            table.add(chunk)
+    log.info("Knowledge base synced: %d added, %d removed, %d total", len(fresh), len(stale), len(wanted))
+    return table
+
+
+class FilteredKnowledgeBase:
+    """A keyword-filtered view of the knowledge base used for one request.
+
+    The filter runs inside LanceDB on the search_text column; when no dataset
+    row matches, the search falls back to the built-in medicines.
+    """
+
+    def __init__(self, table, where: Optional[str]):
+        self.table = table
+        self.where = where
+
+    def _search(self, query_vector, where: str, k: int) -> pd.DataFrame:
+        return self.table.search(query_vector).where(where, prefilter=True).limit(k).to_pandas()
+
+    def search(self, query_vector, k: int = 5) -> pd.DataFrame:
+        if self.where is not None:
+            results = self._search(query_vector, self.where, k)
+            if not results.empty:
+                return results
+        return self._search(query_vector, "source = 'fallback'", k)
+
+
+class KnowledgeBase:
+    def __init__(self, table, dataset_path: str, dataset_hash: str):
+        self.table = table
+        self.dataset_path = dataset_path
+        self.dataset_hash = dataset_hash
+
+    def filtered(self, keywords: List[str]) -> FilteredKnowledgeBase:
+        return FilteredKnowledgeBase(self.table, _keyword_filter(keywords))
+
+
+def dataset_hash(dataset_path: str, kb_dir: Optional[str] = None) -> str:
+    """SHA-256 of the dataset, re-hashed only when its size or mtime changes."""
+    dataset_path = os.path.abspath(dataset_path)
+    stat = os.stat(dataset_path)
+    signature = (dataset_path, stat.st_size, stat.st_mtime)
+    if signature not in _dataset_hashes:
+        manifest = _read_manifest(kb_dir or KB_DIR)
+        if (manifest.get("dataset_path"), manifest.get("size"), manifest.get("mtime")) == signature:
+            _dataset_hashes[signature] = manifest["dataset_hash"]
+        else:
+            _dataset_hashes[signature] = file_sha256(dataset_path)
+    return _dataset_hashes[signature]
+
+
+def get_knowledge_base(dataset_path: str, kb_dir: Optional[str] = None) -> KnowledgeBase:
+    """Open the persistent knowledge base for a dataset, rebuilding only when the CSV changed."""
+    kb_dir = os.path.abspath(kb_dir or KB_DIR)
+    dataset_path = os.path.abspath(dataset_path)
+    stat = os.stat(dataset_path)
+    with _lock:
+        current_hash = dataset_hash(dataset_path, kb_dir)
+        # One table per kb_dir: opening another dataset re-syncs it and replaces this entry
+        kb = _knowledge_bases.get(kb_dir)
+        if kb is not None and kb.dataset_path == dataset_path and kb.dataset_hash == current_hash:
+            return kb
+
+        manifest = _read_manifest(kb_dir)
+        os.makedirs(kb_dir, exist_ok=True)
+        db = lancedb.connect(kb_dir)
+        if manifest.get("embedding_model", EMBEDDING_MODEL) != embeddings.model_id(EMBEDDING_MODEL) and \
+                TABLE_NAME in db.table_names():
+            db.drop_table(TABLE_NAME)
+        if current_hash == manifest.get("dataset_hash") and TABLE_NAME in db.table_names():
+            table = db.open_table(TABLE_NAME)
+        else:
+            log.info("Dataset changed (%s), updating knowledge base", current_hash[:12])
+            table = _sync_table(db, dataset_path)
+        _write_manifest(kb_dir, {
+            "dataset_path": dataset_path,
+            "dataset_hash": current_hash,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "embedding_model": embeddings.model_id(EMBEDDING_MODEL),
+        })
+        kb = KnowledgeBase(table, dataset_path, current_hash)
+        _knowledge_bases[kb_dir] = kb
+        return kb
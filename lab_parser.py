@@ -0,0 +1,182 @@
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+import fitz  # PyMuPDF
+import documents
+import catalog_matcher
+import metrics
+
+log = logging.getLogger("chikitsa.lab_parser")
+
+# -------------------- CONFIG --------------------
+ROW_TOLERANCE = 0.5   # words whose vertical centres differ by less than this fraction of their height share a row
+COLUMN_GAP = 1.0      # a horizontal gap wider than this multiple of the word height starts a new cell
+
+NUMBER = r"\d[\d,]*(?:\.\d+)?"
+VALUE_RE = re.compile(rf"^(?P<qualifier>[<>]=?)?\s*(?P<number>{NUMBER})\s*(?P<flag>H|L|High|Low)?$", re.IGNORECASE)
+# Reference ranges may carry a label: "Desirable <200", "Normal: 70 - 110"
+RANGE_LABEL = r"(?:(?:desirable|normal|optimal|ref(?:erence)?(?:\s+range)?|adults?)\s*:?\s*)?"
+RANGE_RE = re.compile(rf"^{RANGE_LABEL}(?P<low>{NUMBER})\s*(?:-|–|to)\s*(?P<high>{NUMBER})$", re.IGNORECASE)
+BOUND_RE = re.compile(rf"^{RANGE_LABEL}(?P<op><=?|>=?|up\s*to|upto)\s*(?P<bound>{NUMBER})$", re.IGNORECASE)
+# Units a result row may carry without a reference range: mass/molar/enzyme units per volume,
+# counts per volume, %, fL, pg, seconds, mm/hr and eGFR's mL/min/1.73m2
+UNIT_RE = re.compile(
+    r"^(?:%|fl|pg|secs?|seconds|ratio|mm/(?:hr|1st\s*hr)|ml/min(?:/1\.73\s*m2)?"
+    r"|(?:[munpµ]?(?:g|mol|eq|iu|u)|cells|lakhs?|millions?|thousands?|x?\s*10\^?\d+)"
+    r"(?:\s*/\s*(?:[mdµu]?l|cumm|mm3|hpf|24\s*hrs?))?)$",
+    re.IGNORECASE,
+)
+FLAG_RE = re.compile(r"^(?:H|L|High|Low)$", re.IGNORECASE)
+
+PATIENT_PATTERNS = {
+    "name": re.compile(r"(?:Patient(?:\s+Name)?|Name)\s*:\s*(.+?)(?=\s{2,}|\s+Age\b|\s+(?:Gender|Sex)\b|$)",
+                       re.IGNORECASE | re.MULTILINE),
+    "age": re.compile(r"\bAge\s*:\s*(\d{1,3})", re.IGNORECASE),
+    "gender": re.compile(r"\b(?:Gender|Sex)\s*:\s*(Male|Female|M|F)\b", re.IGNORECASE),
+}
+
+
+def _number(text: str):
+    value = float(text.replace(",", ""))
+    return int(value) if value.is_integer() else value
+
+
+def page_rows(page) -> List[List[str]]:
+    """Group a page's words into table rows, each a list of cells ordered left to right."""
+    words = sorted(page.get_text("words"), key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+    lines = []
+    for word in words:
+        x0, y0, x1, y1, text = word[:5]
+        height = max(y1 - y0, 1.0)
+        centre = (y0 + y1) / 2
+        if lines and abs(lines[-1]["centre"] - centre) < height * ROW_TOLERANCE:
+            lines[-1]["words"].append((x0, x1, height, text))
+        else:
+            lines.append({"centre": centre, "words": [(x0, x1, height, text)]})
+
+    rows = []
+    for line in lines:
+        cells, last_x1 = [], None
+        for x0, x1, height, text in sorted(line["words"]):
+            if last_x1 is None or x0 - last_x1 > height * COLUMN_GAP:
+                cells.append(text)
+            else:
+                cells[-1] += " " + text
+            last_x1 = x1
+        rows.append(cells)
+    return rows
+
+
+def flag_value(value, reference_range: str) -> Optional[str]:
+    """'high' or 'low' when a numeric value falls outside its reference range, else None."""
+    if not isinstance(value, (int, float)) or not reference_range:
+        return None
+    match = RANGE_RE.match(reference_range)
+    if match:
+        if value < _number(match["low"]):
+            return "low"
+        if value > _number(match["high"]):
+            return "high"
+        return None
+    match = BOUND_RE.match(reference_range)
+    if match:
+        op, bound = match["op"].lower(), _number(match["bound"])
+        if op.startswith(">"):
+            return "low" if value < bound or (op == ">" and value == bound) else None
+        return "high" if value > bound or (op == "<" and value == bound) else None
+    return None
+
+
+def parse_row(cells: List[str]) -> Optional[Tuple[str, Dict]]:
+    """Read one table row as (test_name, {value, unit, reference_range}); None if it is not a result row."""
+    for i, cell in enumerate(cells[1:], start=1):
+        match = VALUE_RE.match(cell)
+        if match:
+            break
+    else:
+        return None
+    name = " ".join(cells[:i]).strip(" :")
+    if not re.search(r"[A-Za-z]", name):
+        return None
+
+    unit, reference_range, flag = "", "", match["flag"]
+    for cell in cells[i + 1:]:
+        if RANGE_RE.match(cell) or BOUND_RE.match(cell):
+            reference_range = reference_range or cell
+        elif FLAG_RE.match(cell):
+            flag = flag or cell  # "H"/"L" printed in a column of its own
+        elif not unit and not VALUE_RE.match(cell):
+            unit = cell
+    # A label and a number alone ("Page 1 of 2", a collection date) is not a result
+    if not reference_range and not UNIT_RE.match(unit):
+        return None
+
+    number = _number(match["number"])
+    value = f"{match['qualifier']}{number}" if match["qualifier"] else number
+    result = {"value": value, "unit": unit, "reference_range": reference_range}
+    if flag and not reference_range:
+        result["flag"] = "high" if flag.lower().startswith("h") else "low"
+    return name, result
+
+
+def parse_patient_info(text: str) -> Dict:
+    info = {}
+    for field, pattern in PATIENT_PATTERNS.items():
+        match = pattern.search(text)
+        if match:
+            info[field] = _number(match.group(1)) if field == "age" else match.group(1).strip()
+    return info
+
+
+def _catalog_tests(line: str) -> List[str]:
+    """Catalog test names mentioned in a line of text, if it has a number in it."""
+    if not re.search(r"\d", line):
+        return []
+    try:
+        return catalog_matcher.get_catalog().test_names(line)
+    except OSError:
+        return []
+
+
+@metrics.timed_stage("parse_lab_tables")
+def parse_pdf(pdf_path: str) -> Dict:
+    """Rule-based extraction of patient info and lab results from a PDF's text layer.
+
+    Returns the patient_info / test_results / abnormal_values part of the entity
+    schema, plus what the parse missed, for the LLM extractor to cover:
+    scanned_pages (too empty to parse; the text stage OCR'd them) and
+    unparsed_tests (catalog tests in rows with a number that did not parse as
+    a result). When a test appears twice, the first row is kept.
+    """
+    patient_info, test_results, scanned_pages, unparsed = {}, {}, [], []
+    doc = fitz.open(pdf_path)
+    try:
+        for page in doc:
+            text = page.get_text()
+            if len(text.strip()) < documents.MIN_PAGE_TEXT:
+                scanned_pages.append(page.number + 1)
+                continue
+            if not patient_info:
+                patient_info = parse_patient_info(text)
+            for cells in page_rows(page):
+                parsed = parse_row(cells)
+                if not parsed:
+                    unparsed.extend(_catalog_tests(" ".join(cells)))
+                    continue
+                name, result = parsed
+                if name in test_results:
+                    log.warning("Duplicate test %r on page %d; keeping the first value (%s, now %s)",
+                                name, page.number + 1, test_results[name]["value"], result["value"])
+                    continue
+                test_results[name] = result
+    finally:
+        doc.close()
+
+    abnormal_values = []
+    for name, result in test_results.items():
+        severity = flag_value(result["value"], result["reference_range"]) or result.pop("flag", None)
+        if severity:
+            abnormal_values.append({"test_name": name, **result, "severity": severity})
+    captured = {test for name, result in test_results.items() for test in _catalog_tests(f"{name} {result['value']}")}
+    return {"patient_info": patient_info, "test_results": test_results, "abnormal_values": abnormal_values,
+            "scanned_pages": scanned_pages, "unparsed_tests": [t for t in dict.fromkeys(unparsed) if t not in captured]}
@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+log = logging.getLogger("chikitsa.lazy")
+
+# -------------------- CONFIG --------------------
+# Set CHIKITSA_WARMUP=0 to skip loading models when a server starts
+WARMUP_ON_START = os.environ.get("CHIKITSA_WARMUP", "1") != "0"
+
+
+class LazyModule:
+    """Stands in for a heavy module and imports it on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class LazyResource:
+    """A model or other expensive object built once, on first get()."""
+
+    def __init__(self, name: str, loader: Callable):
+        self.name = name
+        self._loader = loader
+        self._value = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.error = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.load_seconds is not None
+
+    def get(self):
+        if self.loaded:
+            return self._value
+        with self._lock:
+            if not self.loaded:
+                start = time.perf_counter()
+                try:
+                    self._value = self._loader()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                self.error = None
+                self.load_seconds = round(time.perf_counter() - start, 3)
+        return self._value
+
+
+_resources: Dict[str, LazyResource] = {}
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+
+def register(name: str, loader: Callable) -> LazyResource:
+    return _resources.setdefault(name, LazyResource(name, loader))
+
+
+def warmup(names: Optional[List[str]] = None):
+    """Load the named resources (all registered ones by default), logging failures instead of raising."""
+    for name in names or list(_resources):
+        if name not in _resources:
+            log.warning("Warm-up skipped unknown resource %s", name)
+            continue
+        try:
+            _resources[name].get()
+            log.info("Warmed up %s in %ss", name, _resources[name].load_seconds)
+        except Exception as e:
+            log.warning("Warm-up of %s failed: %s", name, e)
+
+
+def warmup_in_background(names: Optional[List[str]] = None) -> Optional[threading.Thread]:
+    """Start warm-up on a daemon thread, once per process, so the server can bind immediately."""
+    global _warmup_thread
+    if not WARMUP_ON_START:
+        return None
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warmup, args=(names,), name="warmup", daemon=True)
+            _warmup_thread.start()
+        return _warmup_thread
+
+
+def status(names: Optional[List[str]] = None) -> Dict:
+    """Readiness report for the named resources.
+
+    With warm-up on, ready once every one is loaded; the first readiness probe
+    starts warm-up if the entry point didn't (e.g. under a WSGI server). With
+    CHIKITSA_WARMUP=0 resources load on first use, so readiness can't wait for them.
+    """
+    names = names or list(_resources)
+    warmup_in_background(names)
+    models = {
+        name: {"loaded": _resources[name].loaded, "load_seconds": _resources[name].load_seconds,
+               "error": _resources[name].error}
+        for name in names if name in _resources
+    }
+    ready = len(models) == len(names) and (not WARMUP_ON_START or all(m["loaded"] for m in models.values()))
+    return {"ready": ready, "warmup": WARMUP_ON_START, "models": models}
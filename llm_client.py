@@ -0,0 +1,240 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+
+# -------------------- CONFIG --------------------
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+CONNECT_TIMEOUT = float(os.environ.get("CHIKITSA_LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("CHIKITSA_LLM_READ_TIMEOUT", "300"))
+MAX_RETRIES = int(os.environ.get("CHIKITSA_LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.environ.get("CHIKITSA_LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = 10.0
+POOL_SIZE = int(os.environ.get("CHIKITSA_LLM_POOL_SIZE", "16"))
+BREAKER_THRESHOLD = int(os.environ.get("CHIKITSA_LLM_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.environ.get("CHIKITSA_LLM_BREAKER_COOLDOWN", "30"))
+# Conversations keep the model loaded between turns so its KV cache survives
+OLLAMA_KEEP_ALIVE = os.environ.get("CHIKITSA_OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_NUM_CTX = int(os.environ.get("CHIKITSA_OLLAMA_NUM_CTX", "8192"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures; lets one trial call through after `cooldown`."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class LLMClient:
+    """Shared HTTP client for every LLM backend: pooled keep-alive connections,
+    connect/read timeouts, jittered exponential retries and a per-backend circuit breaker."""
+
+    def __init__(self, pool_size: int = POOL_SIZE, max_retries: int = MAX_RETRIES,
+                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, backend: str) -> CircuitBreaker:
+        with self._lock:
+            return self._breakers.setdefault(backend, CircuitBreaker())
+
+    def _record(self, backend: str, seconds: float, outcome: str):
+        with self._lock:
+            self._latencies.setdefault(backend, deque(maxlen=1000)).append(seconds)
+            counts = self._counts.setdefault(backend, {"ok": 0, "error": 0, "retries": 0, "rejected": 0})
+            counts[outcome] += 1
+        metrics.LLM_SECONDS.observe(seconds, backend=backend, outcome=outcome)
+
+    def _send(self, url: str, payload: Dict, headers: Optional[Dict], timeout, stream: bool) -> requests.Response:
+        backend = urlsplit(url).netloc
+        breaker = self._breaker(backend)
+        if not breaker.allow():
+            self._record(backend, 0.0, "rejected")
+            raise CircuitOpen(f"Circuit open for {backend}, not calling it for now.")
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, headers=headers,
+                                             timeout=timeout or self.timeout, stream=stream)
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    response.close()
+                    raise requests.exceptions.HTTPError(f"{response.status_code} from {backend}", response=response)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                response = getattr(e, "response", None)
+                status = response.status_code if response is not None else None
+                if response is not None:
+                    response.close()
+                if status is None:
+                    transient = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                else:
+                    transient = status in RETRY_STATUSES
+                if not transient or attempt == self.max_retries:
+                    self._record(backend, time.perf_counter() - start, "error")
+                    # A 4xx means the backend is up and rejected the request, so it doesn't count against it;
+                    # anything else (bad redirects, truncated bodies, ...) does, and releases a half-open trial
+                    if status is not None and not transient:
+                        breaker.record_success()
+                    else:
+                        breaker.record_failure()
+                    raise
+                self._record(backend, time.perf_counter() - start, "retries")
+                time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+                continue
+            self._record(backend, time.perf_counter() - start, "ok")
+            breaker.record_success()
+            return response
+
+    def post_json(self, url: str, payload: Dict, headers: Optional[Dict] = None, timeout=None) -> Dict:
+        body = self._send(url, payload, headers, timeout, stream=False).json()
+        metrics.record_llm_usage(urlsplit(url).netloc, body)
+        return body
+
+    @contextmanager
+    def stream(self, url: str, payload: Dict, headers: Optional[Dict] = None, timeout=None):
+        """Open a streaming response. Only establishing the stream is retried;
+        a failure part-way through is raised to the caller."""
+        response = self._send(url, payload, headers, timeout, stream=True)
+        try:
+            yield response
+        finally:
+            response.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            result = {}
+            for backend, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                result[backend] = {
+                    **self._counts[backend],
+                    "p50_seconds": round(ordered[len(ordered) // 2], 4),
+                    "p95_seconds": round(ordered[int(len(ordered) * 0.95)], 4),
+                    "circuit": self._breakers[backend].state if backend in self._breakers else "closed",
+                }
+            return result
+
+
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> LLMClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+def ollama_generate(prompt: str, model: str, format: Optional[str] = None, **options) -> Dict:
+    """Non-streaming call to Ollama's /api/generate; returns the full response object."""
+    payload = {"model": model, "prompt": prompt, "stream": False, **options}
+    if format:
+        payload["format"] = format
+    return get_client().post_json(f"{OLLAMA_URL}/api/generate", payload)
+
+
+class OllamaLLM:
+    """Stands in for langchain's Ollama(model=...) where it is called directly with a prompt."""
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def __call__(self, prompt: str) -> str:
+        return ollama_generate(prompt, self.model)["response"]
+
+
+class OllamaConversation:
+    """A multi-turn /api/generate session that carries Ollama's returned context forward.
+
+    The first prompt is sent in full; later ones send only the new text together
+    with the token context from the previous reply, so Ollama can reuse the KV
+    cache instead of re-reading the whole report. When the context gets close to
+    num_ctx (Ollama would silently truncate it) the conversation ends and the
+    caller starts a new one with a full prompt.
+    """
+
+    def __init__(self, model: str, num_ctx: int = OLLAMA_NUM_CTX, keep_alive: str = OLLAMA_KEEP_ALIVE,
+                 headroom: float = 0.8):
+        self.model = model
+        self.num_ctx = num_ctx
+        self.keep_alive = keep_alive
+        self.max_context = int(num_ctx * headroom)
+        self.context = None
+        self.turns = 0
+        self.restarts = 0
+
+    @property
+    def active(self) -> bool:
+        return self.context is not None
+
+    def reset(self):
+        if self.context is not None:
+            self.restarts += 1
+        self.context = None
+
+    def send(self, prompt: str) -> str:
+        options = {"keep_alive": self.keep_alive, "options": {"num_ctx": self.num_ctx}}
+        if self.context is not None:
+            options["context"] = self.context
+        body = ollama_generate(prompt, self.model, **options)
+        self.context = body.get("context") or None
+        if self.context is not None and len(self.context) > self.max_context:
+            self.reset()
+        self.turns += 1
+        return body["response"]
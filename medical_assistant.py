@@ -1,25 +1,37 @@
 import os
 import re
+import json
 import queue
 import base64
 import tempfile
+import time
 import threading
 import requests
-from flask import Flask, request, jsonify
+import llm_client
+import metrics
+import embeddings
+import lazy
+import semantic_cache
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from gtts import gTTS  # Optional if you want TTS audio stream later
 
 # -------------------- CONFIG --------------------
-MISTRAL_API_KEY = "qCrx2JAOa9tDelNuVPhSusV5Fogl1NEL"
+MISTRAL_API_KEY = os.environ.get("MISTRAL_API_KEY", "qCrx2JAOa9tDelNuVPhSusV5Fogl1NEL")
 MISTRAL_MEDICAL_MODEL = "mistral-large-latest"
-MISTRAL_ENDPOINT = "https://api.mistral.ai/v1/chat/completions"
+MISTRAL_ENDPOINT = os.environ.get("MISTRAL_ENDPOINT", "https://api.mistral.ai/v1/chat/completions")
+
+# Near-duplicate questions ("what to take for a fever" / "fever medicine dosage")
+# reuse an earlier reply instead of another paid completion
+response_cache = semantic_cache.SemanticCache(lambda text: embeddings.encode(text))
 
 # -------------------- APP INIT --------------------
 app = Flask(__name__)
 CORS(app)  # Enable cross-origin for frontend access
+metrics.init_app(app, "medical_assistant")
 
 # -------------------- MEDICAL LLM --------------------
-def get_medical_response(user_input, language="en"):
+def build_chat_request(user_input, stream=False):
     system_prompt = (
         """You are a helpful medical assistant speaking on a phone call. Your responses should be:
 1. Direct, crisp, and straight to the point
@@ -44,16 +56,65 @@ If it's not a health-related query, respond: "I'm here to help with health conce
             {"role": "user", "content": user_input}
         ],
         "max_tokens": 500,
-        "temperature": 0.7
+        "temperature": 0.7,
+        "stream": stream
     }
+    return headers, data
+
+
+def cached_response(user_input):
+    return response_cache.get(user_input) if semantic_cache.ENABLED else None
+
 
+def cache_response(user_input, reply, seconds):
+    if semantic_cache.ENABLED and reply:
+        response_cache.put(user_input, reply, seconds)
+
+
+@metrics.timed_stage("chat_completion")
+def get_medical_response(user_input, language="en"):
+    cached = cached_response(user_input)
+    if cached is not None:
+        return cached
+    headers, data = build_chat_request(user_input)
+    start = time.perf_counter()
     try:
-        response = requests.post(MISTRAL_ENDPOINT, json=data, headers=headers, timeout=30)
-        response.raise_for_status()
-        result = response.json()
-        return result["choices"][0]["message"]["content"]
+        result = llm_client.get_client().post_json(MISTRAL_ENDPOINT, data, headers=headers, timeout=(5, 30))
     except requests.exceptions.RequestException as e:
         return f"Error: Unable to fetch response. {str(e)}"
+    reply = result["choices"][0]["message"]["content"]
+    cache_response(user_input, reply, time.perf_counter() - start)
+    return reply
+
+
+def stream_medical_response(user_input, language="en"):
+    """Yield reply tokens as the chat completions endpoint streams them (SSE deltas)."""
+    cached = cached_response(user_input)
+    if cached is not None:
+        yield cached
+        return
+    headers, data = build_chat_request(user_input, stream=True)
+    start = time.perf_counter()
+    tokens = []
+    # The read timeout applies between chunks, not to the whole reply
+    with llm_client.get_client().stream(MISTRAL_ENDPOINT, data, headers=headers, timeout=(5, 30)) as response:
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            payload = line[len("data:"):].strip()
+            if payload == "[DONE]":
+                break
+            delta = json.loads(payload)["choices"][0].get("delta", {})
+            if delta.get("content"):
+                tokens.append(delta["content"])
+                yield delta["content"]
+        else:
+            return  # stream ended without [DONE]; don't cache a partial reply
+    cache_response(user_input, "".join(tokens), time.perf_counter() - start)
+
+
+def sse_event(payload):
+    return f"data: {json.dumps(payload)}\n\n"
 
 # -------------------- API ENDPOINT --------------------
 @app.route("/api/message", methods=["POST"])
@@ -67,6 +128,30 @@ def message_api():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/api/message/stream", methods=["POST"])
+def message_stream_api():
+    user_input = request.json.get("message", "")
+    if not user_input.strip():
+        return jsonify({"error": "Empty message"}), 400
+
+    def generate():
+        try:
+            for token in stream_medical_response(user_input):
+                yield sse_event({"token": token})
+            yield sse_event({"done": True})
+        except Exception as e:
+            yield sse_event({"error": f"Unable to fetch response. {str(e)}"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(response_cache.stats())
+
 # -------------------- ROOT CHECK --------------------
 @app.route("/", methods=["GET"])
 def root():
@@ -74,5 +159,8 @@ def root():
 
 # -------------------- MAIN --------------------
 if __name__ == "__main__":
+    metrics.configure_logging()
+    if semantic_cache.ENABLED:
+        lazy.warmup_in_background(["embedding_model"])
     print("✅ Medical Assistant API running at http://localhost:5005")
     app.run(host="0.0.0.0", port=5005, debug=True)
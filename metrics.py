@@ -0,0 +1,207 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+# -------------------- TRACE IDS --------------------
+trace_id_var = contextvars.ContextVar("trace_id", default="-")
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def configure_logging(level=logging.INFO):
+    handler = logging.StreamHandler()
+    handler.addFilter(TraceIdFilter())
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+log = logging.getLogger("chikitsa.metrics")
+
+# -------------------- METRIC TYPES --------------------
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(2 ** p for p in range(16, 34, 2))  # 64 KiB .. 8 GiB
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels(labels, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {series[-1]}")
+        return lines
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# -------------------- PROJECT METRICS --------------------
+STAGE_SECONDS = Histogram("chikitsa_stage_seconds", "Wall time of a pipeline stage.")
+# Process-wide: stages running concurrently on other threads add to each other's figure
+STAGE_MEMORY = Histogram("chikitsa_process_rss_growth_bytes",
+                         "Growth of the whole process's resident memory while a pipeline stage ran.", BYTES_BUCKETS)
+STAGE_ERRORS = Counter("chikitsa_stage_errors_total", "Pipeline stages that raised.")
+OCR_PAGES = Counter("chikitsa_ocr_pages_total", "Document pages read, by method (text layer, OCR or cached OCR).")
+PAGE_SECONDS = Histogram("chikitsa_page_extract_seconds", "Time to extract one document page, by method.")
+OCR_RENDERS = Counter("chikitsa_ocr_renders_total", "Pages rasterized for OCR, by render DPI.")
+LLM_SECONDS = Histogram("chikitsa_llm_request_seconds", "Latency of LLM backend calls.")
+LLM_TOKENS = Counter("chikitsa_llm_tokens_total", "Tokens reported by LLM backends, by kind.")
+CACHE_EVENTS = Counter("chikitsa_cache_events_total", "Cache lookups by cache and result (hit/miss).")
+CACHE_SECONDS_SAVED = Counter("chikitsa_cache_seconds_saved_total", "Backend time avoided by cache hits.")
+HTTP_SECONDS = Histogram("chikitsa_http_request_seconds", "Latency of HTTP requests served.")
+
+
+def _rss_bytes() -> int:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage and record the process's RSS growth meanwhile; logs one line tagged with the trace id."""
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        growth = max(0, _rss_bytes() - rss_before)
+        STAGE_SECONDS.observe(seconds, stage=name)
+        STAGE_MEMORY.observe(growth, stage=name)
+        log.info("stage=%s seconds=%.3f process_rss_growth_mb=%.1f", name, seconds, growth / (1024 * 1024))
+
+
+def timed_stage(name: str):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def cache_event(cache: str, hit: bool, count: int = 1):
+    if count:
+        CACHE_EVENTS.inc(count, cache=cache, result="hit" if hit else "miss")
+
+
+def record_llm_usage(backend: str, body: Dict):
+    """Count tokens from an Ollama (prompt_eval_count/eval_count) or chat completions (usage) response."""
+    usage = body.get("usage") or {}
+    prompt = body.get("prompt_eval_count", usage.get("prompt_tokens"))
+    completion = body.get("eval_count", usage.get("completion_tokens"))
+    if prompt:
+        LLM_TOKENS.inc(prompt, backend=backend, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, backend=backend, kind="completion")
+
+
+# -------------------- FLASK --------------------
+def init_app(app, service: str):
+    """Add trace ids, request timing and a /metrics endpoint to a Flask app."""
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_trace():
+        g.trace_token = trace_id_var.set(request.headers.get("X-Request-Id") or uuid.uuid4().hex[:16])
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def _finish_trace(response):
+        seconds = time.perf_counter() - g.request_start
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_SECONDS.observe(seconds, service=service, endpoint=endpoint, status=response.status_code)
+        response.headers["X-Request-Id"] = trace_id_var.get()
+        logging.getLogger(f"chikitsa.{service}").info("%s %s %s %.3fs", request.method, request.path,
+                                                        response.status_code, seconds)
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc):
+        token = g.pop("trace_token", None)
+        if token is not None:
+            trace_id_var.reset(token)
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics_endpoint():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,136 @@
+"""Local stand-in for the LLM backends, used by tests and benchmarks.
+
+Serves the chat completions API (streaming and non-streaming) and Ollama's
+/api/generate with canned replies and configurable latency, so nothing has to
+call a paid API or load a model.
+
+    python mock_llm_server.py --port 8089 --token-delay 0.02
+    MISTRAL_ENDPOINT=http://localhost:8089/v1/chat/completions python medical_assistant.py
+    OLLAMA_URL=http://localhost:8089 python api_server.py
+"""
+import re
+import json
+import time
+import argparse
+import threading
+from flask import Flask, request, jsonify, Response
+from werkzeug.serving import make_server
+
+# -------------------- CONFIG --------------------
+DEFAULT_REPLY = ("For a fever, take paracetamol 500 mg every six hours, up to four doses a day, "
+                 "and drink plenty of fluids. See a doctor if it lasts more than three days.")
+
+MOCK_ENTITIES = {
+    "patient_info": {"name": "Test Patient", "age": 45, "gender": "F"},
+    "test_results": {"HbA1c": {"value": 6.9, "unit": "%", "reference_range": "4.0-5.6"}},
+    "abnormal_values": [
+        {"test_name": "HbA1c", "value": 6.9, "unit": "%", "reference_range": "4.0-5.6", "severity": "high",
+         "condition": "diabetes"},
+        {"test_name": "Vitamin B12", "value": 150, "unit": "pg/mL", "reference_range": "200-900",
+         "severity": "low", "condition": "vitamin B12 deficiency"},
+    ],
+    "probable_diseases": ["diabetes"],
+    "conditions": ["vitamin B12 deficiency"],
+    "severity_notes": ["confirmed diabetes"],
+}
+
+MOCK_RECOMMENDATIONS = {
+    "diagnoses": ["Type 2 diabetes (confirmed)", "Vitamin B12 deficiency"],
+    "recommendations": ["Metformin 500mg twice daily", "Cyanocobalamin 1000 mcg weekly IM"],
+    "side_effects": ["GI upset", "Injection site pain"],
+    "alternatives": ["Sitagliptin", "Hydroxocobalamin"],
+    "lifestyle_recommendations": ["Low glycemic diet", "30 minutes of walking daily"],
+}
+
+app = Flask(__name__)
+# PROMPT_TOKEN_DELAY models prefill: /api/generate charges it per new prompt token,
+# while tokens passed back in `context` are free, as with a warm KV cache
+app.config.update(REPLY=DEFAULT_REPLY, FIRST_TOKEN_DELAY=0.1, TOKEN_DELAY=0.02, PROMPT_TOKEN_DELAY=0.0)
+
+
+def split_tokens(text):
+    return re.findall(r"\S+\s*", text)
+
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+    body = request.get_json(force=True)
+    tokens = split_tokens(app.config["REPLY"])[:body.get("max_tokens", 500)]
+    first_delay = app.config["FIRST_TOKEN_DELAY"]
+    token_delay = app.config["TOKEN_DELAY"]
+
+    if not body.get("stream"):
+        time.sleep(first_delay + token_delay * len(tokens))
+        return jsonify({
+            "id": "mock-completion",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                         "finish_reason": "stop"}],
+            "usage": {"completion_tokens": len(tokens)},
+        })
+
+    def generate():
+        time.sleep(first_delay)
+        for token in tokens:
+            chunk = {"id": "mock-completion", "object": "chat.completion.chunk", "model": body.get("model"),
+                     "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk)}\n\n"
+            time.sleep(token_delay)
+        yield "data: [DONE]\n\n"
+
+    return Response(generate(), mimetype="text/event-stream")
+
+
+def ollama_reply(prompt, format=None):
+    if "Extract the following medical entities" in prompt:
+        return json.dumps(MOCK_ENTITIES)
+    if format == "json":
+        return json.dumps(MOCK_RECOMMENDATIONS)
+    return app.config["REPLY"]
+
+
+@app.route("/api/generate", methods=["POST"])
+def ollama_generate():
+    body = request.get_json(force=True)
+    prompt = body.get("prompt", "")
+    reply = ollama_reply(prompt, body.get("format"))
+    tokens = split_tokens(reply)
+    prompt_tokens = len(split_tokens(prompt))
+    start = time.perf_counter()
+    time.sleep(app.config["FIRST_TOKEN_DELAY"] + app.config["PROMPT_TOKEN_DELAY"] * prompt_tokens
+               + app.config["TOKEN_DELAY"] * len(tokens))
+    return jsonify({
+        "model": body.get("model"),
+        "response": reply,
+        "done": True,
+        "context": list(range(len(body.get("context") or []) + prompt_tokens + len(tokens))),
+        "prompt_eval_count": prompt_tokens,
+        "eval_count": len(tokens),
+        "total_duration": int((time.perf_counter() - start) * 1e9),
+    })
+
+
+@app.route("/api/tags", methods=["GET"])
+def ollama_tags():
+    return jsonify({"models": [{"name": "mistral:latest"}, {"name": "llama3:latest"}]})
+
+
+def serve_in_thread(port=0, **config):
+    """Start the mock server on a background thread; returns (server, base_url)."""
+    app.config.update(**config)
+    server = make_server("127.0.0.1", port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock LLM backend")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--first-token-delay", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0)
+    args = parser.parse_args()
+    app.config.update(FIRST_TOKEN_DELAY=args.first_token_delay, TOKEN_DELAY=args.token_delay,
+                      PROMPT_TOKEN_DELAY=args.prompt_token_delay)
+    app.run(host="127.0.0.1", port=args.port, threaded=True)
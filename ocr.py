@@ -0,0 +1,48 @@
+import os
+import numpy as np
+import lazy
+import metrics
+
+easyocr = lazy.lazy_import("easyocr")
+
+# -------------------- CONFIG --------------------
+OCR_WORKERS = int(os.environ.get("CHIKITSA_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Adaptive render resolution: pages are OCR'd at OCR_DPI, and only those where that
+# finds fewer than OCR_MIN_DENSITY characters per square inch (small print, faint
+# scans, near-blank covers) are rendered again at OCR_HIGH_DPI.
+OCR_DPI = int(os.environ.get("CHIKITSA_OCR_DPI", "120"))
+OCR_HIGH_DPI = int(os.environ.get("CHIKITSA_OCR_HIGH_DPI", "250"))
+OCR_MIN_DENSITY = float(os.environ.get("CHIKITSA_OCR_MIN_DENSITY", "2.0"))
+
+_reader = lazy.register("ocr_reader", lambda: easyocr.Reader(['en']))
+
+
+def get_reader():
+    return _reader.get()
+
+
+def pixmap_to_array(pix) -> np.ndarray:
+    """View a PyMuPDF pixmap as an RGB numpy array without touching disk."""
+    image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    if pix.n == 4:
+        image = image[:, :, :3]
+    return np.ascontiguousarray(image)
+
+
+def render_page(page, dpi: int = OCR_DPI) -> np.ndarray:
+    metrics.OCR_RENDERS.inc(dpi=dpi)
+    return pixmap_to_array(page.get_pixmap(dpi=dpi))
+
+
+def text_density(text: str, page) -> float:
+    """Non-space characters per square inch of the page (PyMuPDF rects are in 1/72 inch)."""
+    area = (page.rect.width / 72) * (page.rect.height / 72)
+    return sum(not c.isspace() for c in text) / area if area else 0.0
+
+
+def needs_high_dpi(text: str, page, dpi: int) -> bool:
+    return dpi < OCR_HIGH_DPI and text_density(text, page) < OCR_MIN_DENSITY
+
+
+def ocr_image(image) -> str:
+    return "\n".join(get_reader().readtext(image, detail=0))
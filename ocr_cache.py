@@ -0,0 +1,117 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+import numpy as np
+import metrics
+import ocr
+
+# -------------------- CONFIG --------------------
+CACHE_PATH = os.environ.get("CHIKITSA_OCR_CACHE", "cache/ocr.sqlite")
+MAX_ENTRIES = int(os.environ.get("CHIKITSA_OCR_CACHE_MAX", "20000"))
+ENABLED = os.environ.get("CHIKITSA_OCR_CACHE_ENABLED", "1") != "0"
+OCR_VERSION = "easyocr-en-1"  # bump when the reader, languages or page handling change
+
+
+def image_key(image: np.ndarray) -> str:
+    """Exact hash of a rendered page: the same scan rendered at the same DPI gives the same key.
+
+    Deliberately not perceptual: two lab pages with the same letterhead and layout
+    but different values would be near-duplicates, and must not share OCR text.
+    The high-DPI retry settings are part of the key, since they decide which
+    render's text is stored.
+    """
+    settings = f"{OCR_VERSION}\0{ocr.OCR_DPI}\0{ocr.OCR_HIGH_DPI}\0{ocr.OCR_MIN_DENSITY}"
+    digest = hashlib.sha256(f"{settings}\0{image.shape}\0".encode("utf-8"))
+    digest.update(np.ascontiguousarray(image).data)
+    return digest.hexdigest()
+
+
+def file_key(path: str) -> str:
+    digest = hashlib.sha256(f"{OCR_VERSION}\0file\0".encode("utf-8"))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """On-disk OCR text per page image, bounded by entry count with LRU eviction."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ocr_pages ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, dpi INTEGER, seconds REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_last_used ON ocr_pages(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """{text, dpi, seconds} stored for key, where seconds is what the original OCR took."""
+        with self._lock:
+            row = self._conn.execute("SELECT text, dpi, seconds FROM ocr_pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.seconds_saved += row[2]
+                self._conn.execute("UPDATE ocr_pages SET last_used = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        metrics.cache_event("ocr_page", hit=row is not None)
+        if row is None:
+            return None
+        metrics.CACHE_SECONDS_SAVED.inc(row[2], cache="ocr_page")
+        return {"text": row[0], "dpi": row[1], "seconds": row[2]}
+
+    def put(self, key: str, text: str, dpi: Optional[int], seconds: float):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO ocr_pages VALUES (?, ?, ?, ?, ?)",
+                               (key, text, dpi, seconds, time.time()))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM ocr_pages").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM ocr_pages WHERE key IN (SELECT key FROM ocr_pages ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+            self.evictions += overflow
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM ocr_pages").fetchone()[0]
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions, "seconds_saved": self.seconds_saved, "entries": size,
+                "max_entries": self.max_entries}
+
+
+_cache: Optional[OcrCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[OcrCache]:
+    """The shared cache, or None when CHIKITSA_OCR_CACHE_ENABLED=0."""
+    global _cache
+    if not ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = OcrCache()
+        return _cache
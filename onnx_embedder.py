@@ -0,0 +1,141 @@
+import os
+import json
+import inspect
+import argparse
+from typing import List
+import numpy as np
+import lazy
+
+onnxruntime = lazy.lazy_import("onnxruntime")
+tokenizers = lazy.lazy_import("tokenizers")
+
+# -------------------- CONFIG --------------------
+MODEL_ROOT = os.environ.get("CHIKITSA_ONNX_MODEL_DIR", "models")
+ONNX_THREADS = int(os.environ.get("CHIKITSA_ONNX_THREADS", "0"))  # 0 lets onnxruntime pick (all physical cores)
+MODEL_FILE = "model_int8.onnx"
+EXPORT_FILE = "export.json"
+
+
+def model_dir(model_name: str) -> str:
+    return os.path.join(MODEL_ROOT, f"{model_name}-onnx-int8")
+
+
+class OnnxEncoder:
+    """int8-quantized ONNX export of a sentence-transformers model, run with onnxruntime.
+
+    Reproduces the model's mean pooling and normalization, so encode() is a
+    drop-in for SentenceTransformer.encode on CPU-only nodes without torch.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, EXPORT_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = tokenizers.Tokenizer.from_file(os.path.join(path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+        options = onnxruntime.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(os.path.join(path, MODEL_FILE), options,
+                                                    providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: List[str], normalize: bool) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": np.array([e.ids for e in encodings], dtype=np.int64), "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        hidden = self.session.run(None, feeds)[0]
+        weights = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if normalize:
+            pooled /= np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        """Same contract as SentenceTransformer.encode: a str gives one vector, a list gives a matrix."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        normalize = self.config["normalize"] or normalize_embeddings
+        vectors = np.empty((len(texts), self.config["dimension"]), dtype=np.float32)
+        # Longest first, so each batch pads to similar lengths (as sentence-transformers does)
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            vectors[batch] = self._encode_batch([texts[i] for i in batch], normalize)
+        return vectors[0] if single else vectors
+
+
+def export(model_name: str, out_dir: str = None) -> str:
+    """Export a mean-pooled sentence-transformers model to ONNX with int8 weights.
+
+    Needs torch, sentence-transformers and onnx on the exporting machine only;
+    the result runs with onnxruntime and tokenizers alone.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    out_dir = out_dir or model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer, pooling = model[0], model[1]
+    pooling_config = pooling.get_config_dict()  # older sentence-transformers use one flag per mode
+    if not (pooling_config.get("pooling_mode") == "mean" or pooling_config.get("pooling_mode_mean_tokens")):
+        raise ValueError(f"{model_name} does not use mean pooling; only mean-pooled models can be exported")
+    hf_tokenizer = transformer.tokenizer
+    hf_model = transformer.auto_model.eval()
+    sample = hf_tokenizer(["a sample sentence for export"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Positional inputs in, last_hidden_state out, whatever the HF forward() signature."""
+
+        def __init__(self):
+            super().__init__()
+            self.model = hf_model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    # Newer torch defaults to the dynamo exporter; the TorchScript one handles dynamic_axes without onnxscript
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(), tuple(sample[name] for name in input_names), fp32_path,
+                          input_names=input_names, output_names=["last_hidden_state"],
+                          dynamic_axes=dynamic_axes, opset_version=14, **legacy)
+    # Dynamic quantization: int8 weights, activations quantized per batch at run time
+    quantize_dynamic(fp32_path, os.path.join(out_dir, MODEL_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    hf_tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+    config = {
+        "model_name": model_name,
+        "max_seq_length": model.max_seq_length,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "normalize": any(type(module).__name__ == "Normalize" for module in model),
+        "pad_token": hf_tokenizer.pad_token,
+        "pad_token_id": hf_tokenizer.pad_token_id,
+    }
+    with open(os.path.join(out_dir, EXPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return out_dir
+
+
+def main():
+    import embeddings
+
+    parser = argparse.ArgumentParser(description="Export an embedding model to int8 ONNX for "
+                                                 "CHIKITSA_EMBEDDING_BACKEND=onnx-int8.")
+    parser.add_argument("--model", default=embeddings.DEFAULT_MODEL)
+    parser.add_argument("--out", help=f"output directory (default {model_dir('<model>')})")
+    args = parser.parse_args()
+    path = export(args.model, args.out)
+    print(f"Exported {args.model} to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Optional
+import metrics
+
+# -------------------- CONFIG --------------------
+CACHE_DIR = os.environ.get("CHIKITSA_PIPELINE_CACHE", "cache/pipeline")
+
+
+def stage_key(*parts) -> str:
+    """Chain a stage's inputs (upstream key, model name, prompt version, ...) into one key."""
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """Content-addressed JSON store of per-stage pipeline outputs."""
+
+    def __init__(self, base_dir: str = CACHE_DIR):
+        self.base_dir = base_dir
+
+    def _path(self, stage: str, key: str) -> str:
+        return os.path.join(self.base_dir, stage, key[:2], f"{key}.json")
+
+    def get(self, stage: str, key: str) -> Optional[Any]:
+        path = self._path(stage, key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            metrics.cache_event(f"pipeline_{stage}", hit=False)
+            return None
+        metrics.cache_event(f"pipeline_{stage}", hit=True)
+        return value
+
+    def put(self, stage: str, key: str, value: Any):
+        path = self._path(stage, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+
+stage_cache = StageCache()
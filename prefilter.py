@@ -0,0 +1,32 @@
+import re
+from typing import List
+import numpy as np
+import pandas as pd
+
+
+def build_search_column(df: pd.DataFrame) -> pd.Series:
+    """Lower-cased concatenation of every column, built column-wise instead of per row."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    column = None
+    for name in df.columns:
+        values = df[name].astype(str).where(df[name].notna(), "")
+        column = values if column is None else column + " " + values
+    return column.str.lower()
+
+
+def compile_keywords(keywords: List[str]):
+    """Compile all keywords into one alternation so each row is scanned once."""
+    keywords = sorted({k.lower() for k in keywords if k}, key=len, reverse=True)
+    if not keywords:
+        return None
+    return re.compile("|".join(re.escape(k) for k in keywords))
+
+
+def match_rows(search_column: pd.Series, keywords: List[str]) -> np.ndarray:
+    """Positional indices of rows whose search text contains any keyword."""
+    pattern = compile_keywords(keywords)
+    if pattern is None or search_column.empty:
+        return np.array([], dtype=np.int64)
+    mask = search_column.str.contains(pattern, regex=True, na=False).to_numpy()
+    return np.flatnonzero(mask)
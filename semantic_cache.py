@@ -0,0 +1,139 @@
+import os
+import re
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+import numpy as np
+import metrics
+
+log = logging.getLogger("chikitsa.semantic_cache")
+
+# -------------------- CONFIG --------------------
+ENABLED = os.environ.get("CHIKITSA_SEMANTIC_CACHE", "1") != "0"
+SIMILARITY_THRESHOLD = float(os.environ.get("CHIKITSA_SEMANTIC_CACHE_THRESHOLD", "0.9"))
+TTL_SECONDS = float(os.environ.get("CHIKITSA_SEMANTIC_CACHE_TTL", str(6 * 3600)))
+MAX_ENTRIES = int(os.environ.get("CHIKITSA_SEMANTIC_CACHE_MAX", "5000"))
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share an entry."""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class SemanticCache:
+    """Replies keyed by the meaning of the question, held in an in-process vector index.
+
+    Query vectors are unit-normalised rows of one matrix, so a lookup is a single
+    matrix-vector product. A reply is reused when the nearest stored question is
+    at least `threshold` cosine-similar and younger than `ttl_seconds`; at capacity
+    the least recently used entry is replaced.
+    """
+
+    def __init__(self, encoder: Callable, threshold: float = SIMILARITY_THRESHOLD,
+                 ttl_seconds: float = TTL_SECONDS, max_entries: int = MAX_ENTRIES, name: str = "semantic_response"):
+        self.encoder = encoder
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.name = name
+        self._vectors: Optional[np.ndarray] = None  # max_entries x dim, allocated on first put
+        self._entries = []  # one dict per used row of _vectors
+        self._exact: Dict[str, int] = {}  # normalised query -> row
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _embed(self, normalized: str) -> np.ndarray:
+        vector = np.asarray(self.encoder(normalized), dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _record(self, entry: Optional[Dict]):
+        # caller holds the lock
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            entry["hits"] += 1
+            entry["last_used"] = time.time()
+            self.seconds_saved += entry["seconds"]
+            metrics.CACHE_SECONDS_SAVED.inc(entry["seconds"], cache=self.name)
+        metrics.cache_event(self.name, hit=entry is not None)
+
+    def _live(self, row: int, now: float) -> bool:
+        return now - self._entries[row]["created"] <= self.ttl_seconds
+
+    def get(self, query: str) -> Optional[str]:
+        normalized = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            row = self._exact.get(normalized)
+            if row is not None and self._live(row, now):
+                self._record(self._entries[row])
+                return self._entries[row]["reply"]
+            if not self._entries:
+                self._record(None)
+                return None
+        try:
+            vector = self._embed(normalized)
+        except Exception as e:
+            log.warning("Semantic cache lookup skipped: %s", e)
+            return None
+        with self._lock:
+            scores = self._vectors[:len(self._entries)] @ vector
+            row = int(np.argmax(scores))
+            entry = self._entries[row]
+            if scores[row] >= self.threshold and self._live(row, now):
+                self._record(entry)
+                return entry["reply"]
+            self._record(None)
+            return None
+
+    def put(self, query: str, reply: str, seconds: float):
+        """Store a reply along with how long it took to produce (credited on every hit)."""
+        normalized = normalize_query(query)
+        try:
+            vector = self._embed(normalized)
+        except Exception as e:
+            log.warning("Semantic cache store skipped: %s", e)
+            return
+        now = time.time()
+        entry = {"query": normalized, "reply": reply, "seconds": seconds, "created": now, "last_used": now,
+                 "hits": 0}
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            row = self._exact.get(normalized)
+            if row is None and len(self._entries) < self.max_entries:
+                row = len(self._entries)
+                self._entries.append(entry)
+            else:
+                if row is None:
+                    # Reuse an expired row if there is one, else the least recently used
+                    row = min(range(len(self._entries)),
+                              key=lambda i: (self._live(i, now), self._entries[i]["last_used"]))
+                self._exact.pop(self._entries[row]["query"], None)
+                self._entries[row] = entry
+            self._vectors[row] = vector
+            self._exact[normalized] = row
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            self._exact = {}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "seconds_saved": round(self.seconds_saved, 3),
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+            }
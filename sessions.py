@@ -0,0 +1,142 @@
+import os
+import time
+import secrets
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+# -------------------- CONFIG --------------------
+MAX_RESIDENT_MB = float(os.environ.get("CHIKITSA_SESSION_MEMORY_MB", "512"))
+SESSION_TTL_SECONDS = int(os.environ.get("CHIKITSA_SESSION_TTL_SECONDS", str(6 * 3600)))
+
+
+class SessionManager:
+    """Chatbot instances keyed by session token.
+
+    Every session keeps its report text and on-disk index; only the most recently
+    used sessions keep their vector store in memory, within a byte budget. Sessions
+    idle for longer than the TTL are dropped.
+    """
+
+    def __init__(self, factory: Callable, max_resident_bytes: int = int(MAX_RESIDENT_MB * 1024 * 1024),
+                 ttl_seconds: int = SESSION_TTL_SECONDS):
+        self.factory = factory
+        self.max_resident_bytes = max_resident_bytes
+        self.ttl_seconds = ttl_seconds
+        self._sessions: Dict[str, Dict] = {}
+        self._resident: "OrderedDict[str, int]" = OrderedDict()  # token -> bytes, LRU first
+        self._lock = threading.RLock()
+
+    def create(self):
+        token = secrets.token_urlsafe(24)
+        session = self._new_session()
+        with self._lock:
+            self._sessions[token] = session
+        self.expire()
+        return token, session["chatbot"]
+
+    def _new_session(self) -> Dict:
+        return {"chatbot": self.factory(), "last_used": time.time(), "lock": threading.Lock()}
+
+    def exists(self, token: Optional[str]) -> bool:
+        with self._lock:
+            return bool(token) and token in self._sessions
+
+    @contextmanager
+    def use(self, token: str, load: bool = True):
+        """Hold a session's chatbot exclusively, reloading its vector store if it was spilled.
+
+        Yields None for unknown tokens.
+        """
+        with self._lock:
+            session = self._sessions.get(token)
+        if session is None:
+            yield None
+            return
+        with session["lock"]:
+            session["last_used"] = time.time()
+            if load:
+                session["chatbot"].ensure_loaded()
+                self.mark_loaded(token)
+            yield session["chatbot"]
+
+    @contextmanager
+    def use_or_create(self, token: Optional[str], load: bool = True):
+        """Like use(), but starts a new session when the token is unknown or has expired.
+
+        The lookup and the insert happen under one lock, so the yielded session cannot
+        vanish in between. Yields (token, chatbot).
+        """
+        new_session = None
+        with self._lock:
+            session = self._sessions.get(token) if token else None
+        if session is None:
+            new_session = self._new_session()
+            with self._lock:
+                session = self._sessions.get(token) if token else None
+                if session is None:
+                    token, session = secrets.token_urlsafe(24), new_session
+                    self._sessions[token] = session
+        with session["lock"]:
+            session["last_used"] = time.time()
+            if load:
+                session["chatbot"].ensure_loaded()
+                self.mark_loaded(token)
+            yield token, session["chatbot"]
+        if session is new_session:
+            self.expire()
+
+    def reset_index(self, token: str):
+        """Unload a session's index before it loads a different report.
+
+        Call while holding the session via use(token, load=False).
+        """
+        with self._lock:
+            chatbot = self._sessions[token]["chatbot"]
+            self._resident.pop(token, None)
+        chatbot.unload()
+        chatbot.has_index = False
+
+    def mark_loaded(self, token: str):
+        """Record a session's resident size and spill least recently used sessions over budget.
+
+        Sessions busy answering a question are skipped rather than waited on.
+        """
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return
+            self._resident[token] = session["chatbot"].memory_bytes()
+            self._resident.move_to_end(token)
+            total = sum(self._resident.values())
+            for candidate in list(self._resident):
+                if total <= self.max_resident_bytes:
+                    break
+                other = self._sessions[candidate]
+                if candidate == token or not other["lock"].acquire(blocking=False):
+                    continue
+                try:
+                    other["chatbot"].unload()
+                finally:
+                    other["lock"].release()
+                total -= self._resident.pop(candidate)
+
+    def expire(self):
+        now = time.time()
+        with self._lock:
+            # Sessions held by a request are never dropped under it
+            stale = [t for t, s in self._sessions.items()
+                     if now - s["last_used"] > self.ttl_seconds and not s["lock"].locked()]
+            for token in stale:
+                self._resident.pop(token, None)
+                del self._sessions[token]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "resident": len(self._resident),
+                "resident_bytes": sum(self._resident.values()),
+                "max_resident_bytes": self.max_resident_bytes,
+            }
@@ -0,0 +1,88 @@
+import queue
+import threading
+import contextvars
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Tuple
+
+_STOP = object()
+
+
+class Finished:
+    """Returned by a stage to complete an item early, skipping the stages after it."""
+
+    def __init__(self, value):
+        self.value = value
+
+
+class StagePipeline:
+    """Runs items through a fixed sequence of stages, each with its own worker threads.
+
+    Every stage reads from a bounded queue, so a slow stage blocks the one before
+    it and, at the head, submit() itself: backpressure instead of unbounded
+    buffering. Different items occupy different stages at the same time, e.g. one
+    document's text extraction runs while another waits on the LLM.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable, int]], queue_size: int = 4):
+        self.stages = stages
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self._busy = [0] * len(stages)
+        self._processed = [0] * len(stages)
+        self._lock = threading.Lock()
+        self._threads = []
+        for index, (name, _, workers) in enumerate(stages):
+            threads = [threading.Thread(target=self._work, args=(index,), name=f"{name}-{n}", daemon=True)
+                       for n in range(max(1, workers))]
+            for thread in threads:
+                thread.start()
+            self._threads.append(threads)
+
+    def submit(self, item, timeout: float = None) -> Future:
+        """Queue an item; blocks while the first stage is full (queue.Full after timeout)."""
+        future = Future()
+        # Stages run in the submitter's context so trace ids follow the item
+        self._queues[0].put((item, future, contextvars.copy_context()), timeout=timeout)
+        return future
+
+    def _work(self, index: int):
+        _, fn, _ = self.stages[index]
+        inbox = self._queues[index]
+        while True:
+            entry = inbox.get()
+            if entry is _STOP:
+                return
+            item, future, context = entry
+            with self._lock:
+                self._busy[index] += 1
+            try:
+                result = context.run(fn, item)
+            except BaseException as e:
+                future.set_exception(e)
+                continue
+            finally:
+                with self._lock:
+                    self._busy[index] -= 1
+                    self._processed[index] += 1
+            if isinstance(result, Finished):
+                future.set_result(result.value)
+            elif index == len(self.stages) - 1:
+                future.set_result(result)
+            else:
+                self._queues[index + 1].put((result, future, context))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                name: {"workers": workers, "busy": self._busy[i], "queued": self._queues[i].qsize(),
+                       "processed": self._processed[i]}
+                for i, (name, _, workers) in enumerate(self.stages)
+            }
+
+    def shutdown(self):
+        """Stop the workers once the items already queued have drained."""
+        # Stage by stage, so nothing is forwarded to a stage that has already stopped
+        for inbox, threads in zip(self._queues, self._threads):
+            for _ in threads:
+                inbox.put(_STOP)
+            for thread in threads:
+                thread.join()